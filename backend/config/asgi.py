@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# ASGI 下唯讀端點使用原生 async view（見 store/async_views.py）
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+# 例：uvicorn config.asgi:application --workers 1
+application = ASGIStaticFilesHandler(get_asgi_application())
@@ -0,0 +1,70 @@
+"""
+PostgreSQL 連線設定：優先使用 psycopg3 內建連線池（Django 5.1 的 OPTIONS["pool"]）。
+
+- 連線池：請求借還連線不必每次重新連線，也不需要 CONN_HEALTH_CHECKS 的額外往返（池只借出健康的連線）
+  DATABASE_POOL_MIN_SIZE / DATABASE_POOL_MAX_SIZE / DATABASE_POOL_TIMEOUT（秒，借不到連線時等待的上限）
+- 未安裝 psycopg_pool、或設定 DATABASE_POOL=False 時退回持久連線（DATABASE_CONN_MAX_AGE 秒 + health check）
+- 連線池統計（借出中、等待中、等待時間）由 /api/admin/metrics/ 回傳，用來決定池的大小
+
+每個 worker process 各有一個池，資料庫端的連線數上限要大於 worker 數 × DATABASE_POOL_MAX_SIZE。
+"""
+from __future__ import annotations
+
+import os
+
+from django.db import connections
+
+
+def pool_available() -> bool:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configure(db_config: dict) -> dict:
+    """依環境變數調整 dj_database_url.parse 的結果（直接修改並回傳 db_config）"""
+    db_config["CONN_MAX_AGE"] = int(os.environ.get("DATABASE_CONN_MAX_AGE", "600"))
+    if "postgresql" not in db_config.get("ENGINE", ""):
+        return db_config
+    if os.environ.get("DATABASE_POOL", "True") != "True" or not pool_available():
+        return db_config
+
+    # Django 的連線池不能與持久連線同時使用
+    db_config["CONN_MAX_AGE"] = 0
+    db_config["CONN_HEALTH_CHECKS"] = False
+    db_config.setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", "10")),
+    }
+    return db_config
+
+
+def stats() -> dict[str, dict]:
+    """各資料庫 alias 的連線池統計；沒有使用連線池的 alias 不列出"""
+    result = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        s = pool.get_stats()
+        size, available = s.get("pool_size", 0), s.get("pool_available", 0)
+        queued, wait_ms = s.get("requests_queued", 0), s.get("requests_wait_ms", 0)
+        result[alias] = {
+            "min_size": s.get("pool_min", 0),
+            "max_size": s.get("pool_max", 0),
+            "size": size,
+            "checked_out": size - available,
+            "available": available,
+            "waiting": s.get("requests_waiting", 0),
+            "requests": s.get("requests_num", 0),
+            "queued": queued,  # 借用時池內沒有空閒連線、需要等待的次數
+            "wait_ms_total": wait_ms,
+            "wait_ms_avg": round(wait_ms / queued, 2) if queued else 0.0,
+            "timeouts": s.get("requests_errors", 0),
+            "connections_opened": s.get("connections_num", 0),
+            "connections_lost": s.get("connections_lost", 0),
+        }
+    return result
@@ -0,0 +1,119 @@
+"""
+讀寫分離（設定 DATABASE_REPLICA_URL / DATABASE_REPLICA_URLS 時啟用）。
+
+- 寫入一律走 default（primary）
+- 只有 view 類別標記 use_replica = True 時（後台訂單列表；帶 ETag 的目錄端點一律讀 primary），store 的讀取才走 replica
+- 這個請求寫入過資料庫後，之後的讀取改走 primary；回應另外帶一個短效 cookie，
+  同一個用戶端在 DATABASE_REPLICA_PIN_SECONDS 秒內的請求也都走 primary，避免讀到 replica 尚未同步的資料
+- 管理指令、下單 worker 等請求以外的程式碼一律走 primary
+"""
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = "pin_primary"
+REPLICA_APPS = {"store"}
+
+
+class _RoutingState:
+    __slots__ = ("replica_ok", "wrote")
+
+    def __init__(self, pinned: bool):
+        self.replica_ok = False
+        self.wrote = pinned
+
+
+_state: ContextVar[_RoutingState | None] = ContextVar("db_routing_state", default=None)
+
+
+@contextmanager
+def use_primary():
+    """區塊內的讀取一律走 primary（例如建立會被快取很久的目錄快照）"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    previous, state.replica_ok = state.replica_ok, False
+    try:
+        yield
+    finally:
+        state.replica_ok = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or state is None or not state.replica_ok or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label not in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS  # session / 使用者等剛寫入就要讀的資料留在 primary
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replica 與 primary 是同一份資料
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """為每個請求建立路由狀態；同時支援同步與 async view（ASGI 下不會被轉成同步執行）"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = _RoutingState(pinned=request.COOKIES.get(PIN_COOKIE) == "1")
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        state = _RoutingState(pinned=request.COOKIES.get(PIN_COOKIE) == "1")
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None:
+            view_class = getattr(view_func, "view_class", None)
+            state.replica_ok = getattr(view_class, "use_replica", False)
+
+    def _pin(self, request, response, state: _RoutingState):
+        if settings.DATABASE_REPLICAS and state.wrote and request.COOKIES.get(PIN_COOKIE) != "1":
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,57 @@
+"""
+以 orjson 編碼 / 解析 JSON 的 DRF renderer 與 parser（在 REST_FRAMEWORK 設定中啟用）。
+
+輸出與 DRF 的 JSONRenderer 逐位元組相同：
+- orjson 原生處理 str / int / float / dict / list（含 ReturnDict 等子類別）
+- 其餘型別（Decimal、datetime / date / time、lazy 翻譯字串、UUID、QuerySet ...）交給 DRF 的 JSONEncoder.default，
+  格式與原本一致（Decimal 轉字串、datetime 截到毫秒且 UTC 以 Z 結尾）
+- 與 DRF 一樣跳脫 U+2028 / U+2029
+
+未安裝 orjson、要求縮排（瀏覽器 API、Accept 帶 indent）或設定不是 UNICODE_JSON / COMPACT_JSON 時，
+退回 DRF 原本的 stdlib 實作。
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 依部署環境而定
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent or self.ensure_ascii or not self.compact or self.encoder_class is not JSONEncoder:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # 超過 64 位元的整數等 orjson 不支援的值
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
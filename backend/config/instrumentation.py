@@ -0,0 +1,205 @@
+"""
+請求效能量測（選用）：設定 REQUEST_METRICS=True 時啟用。
+
+每個請求記錄 SQL 查詢數、SQL 時間、view 時間、render 時間與總時間：
+- 以 Server-Timing header 回傳，瀏覽器 DevTools 可以直接看
+- 依 view 名稱累計成直方圖，staff 可透過 /api/admin/metrics/ 取得
+
+SQL 量測使用 connection.execute_wrapper，不需要 DEBUG 也不保存 SQL 字串。
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from . import db_pool
+
+# 直方圖的桶（毫秒），最後一桶為 +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class _ViewStats:
+    __slots__ = ("count", "buckets", "queries", "db_ms", "app_ms", "render_ms", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.queries = 0
+        self.db_ms = 0.0
+        self.app_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, timing: "_RequestTiming") -> None:
+        self.count += 1
+        self.buckets[bisect.bisect_left(BUCKETS_MS, timing.total_ms)] += 1
+        self.queries += timing.queries
+        self.db_ms += timing.db_ms
+        self.app_ms += timing.app_ms
+        self.render_ms += timing.render_ms
+        self.total_ms += timing.total_ms
+        self.max_ms = max(self.max_ms, timing.total_ms)
+
+    def as_dict(self) -> dict:
+        n = self.count or 1
+        return {
+            "count": self.count,
+            "histogram_ms": dict(zip([*map(str, BUCKETS_MS), "+Inf"], self.buckets)),
+            "avg": {
+                "queries": round(self.queries / n, 2),
+                "db_ms": round(self.db_ms / n, 2),
+                "app_ms": round(self.app_ms / n, 2),
+                "render_ms": round(self.render_ms / n, 2),
+                "total_ms": round(self.total_ms / n, 2),
+            },
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: dict[str, _ViewStats] = {}
+
+    def record(self, view_name: str, timing: "_RequestTiming") -> None:
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                stats = self._views[view_name] = _ViewStats()
+            stats.add(timing)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._views.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class _RequestTiming:
+    __slots__ = ("queries", "db_ms", "start", "view_start", "render_start", "app_ms", "render_ms", "total_ms")
+
+    def __init__(self):
+        self.start = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.view_start = None
+        self.render_start = None
+        self.app_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper：計算查詢數與 SQL 時間"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+
+    def server_timing(self) -> str:
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f"app;dur={self.app_ms:.1f}",
+            f"render;dur={self.render_ms:.1f}",
+            f"total;dur={self.total_ms:.1f}",
+        ])
+
+
+class RequestMetricsMiddleware:
+    """
+    view 時間 = process_view 到 process_template_response（扣掉其中的 SQL 時間即為 app，主要是序列化）
+    render 時間 = process_template_response 到 response render 完成（JSON 編碼）
+
+    同時支援同步與 async（放在 middleware 最前面也不會讓 ASGI 下整條 middleware 被轉成同步執行）。
+    資料庫連線是每個執行緒各一份：async view 的 ORM 呼叫在 sync_to_async 的執行緒上執行，
+    所以 async 時 execute_wrapper 裝在那個執行緒的連線上（同一個請求的 thread_sensitive 呼叫都在同一個執行緒）。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = self._start(request)
+        with ExitStack() as stack:
+            _wrap_connections(stack, timing)
+            response = self.get_response(request)
+        return self._finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = self._start(request)
+        stack = ExitStack()
+        await sync_to_async(_wrap_connections)(stack, timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, timing)
+
+    def _start(self, request) -> _RequestTiming:
+        timing = _RequestTiming()
+        timing.start = time.perf_counter()
+        request._metrics = timing
+        return timing
+
+    def _finish(self, request, response, timing: _RequestTiming):
+        end = time.perf_counter()
+        timing.total_ms = (end - timing.start) * 1000
+        if timing.render_start is not None:
+            timing.render_ms = (end - timing.render_start) * 1000
+            timing.app_ms = max(0.0, (timing.render_start - timing.view_start) * 1000 - timing.db_ms)
+        elif timing.view_start is not None:
+            timing.app_ms = max(0.0, (end - timing.view_start) * 1000 - timing.db_ms)
+
+        response.headers["Server-Timing"] = timing.server_timing()
+        match = getattr(request, "resolver_match", None)
+        registry.record(match.view_name if match else "unresolved", timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request._metrics.render_start = time.perf_counter()
+        return response
+
+
+def _wrap_connections(stack: ExitStack, timing: _RequestTiming) -> None:
+    """在目前執行緒的每個資料庫連線裝上 execute_wrapper（stack 關閉時移除）"""
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(timing))
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([permissions.IsAdminUser])
+def metrics_view(request):
+    """
+    GET    /api/admin/metrics/：各 view 的累計統計與連線池狀態
+    DELETE /api/admin/metrics/：清空統計
+    """
+    if request.method == "DELETE":
+        registry.reset()
+        return Response(status=204)
+    return Response({"enabled": settings.REQUEST_METRICS, "views": registry.snapshot(), "pools": db_pool.stats()})
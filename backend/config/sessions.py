@@ -0,0 +1,54 @@
+"""
+Session 寫入策略：只有內容改變或快要過期時才寫入，不再每個請求 UPDATE 一次 django_session。
+
+- 滑動過期：session 內記錄上次寫入的時間，距離上次寫入超過 SESSION_REFRESH_AFTER 秒才重新存檔延長期限
+  （持續使用的管理員不會被登出，一般請求只讀不寫）
+- SESSION_READONLY_PATHS（商品、標籤）的 GET / HEAD 完全不存 session、也不送 Set-Cookie
+- 過期的 session 由 manage.py purge_expired_sessions 分批刪除（建議排程每小時執行）
+
+前台用戶不登入、CSRF token 放在 cookie，本來就不會建立 session；session 只用於後台登入。
+"""
+from __future__ import annotations
+
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware as DjangoSessionMiddleware
+from django.utils import timezone
+
+REFRESHED_KEY = "_refreshed_at"
+
+
+def is_readonly_request(request) -> bool:
+    return request.method in ("GET", "HEAD") and request.path.startswith(tuple(settings.SESSION_READONLY_PATHS))
+
+
+class SessionMiddleware(DjangoSessionMiddleware):
+    """取代 django.contrib.sessions 的 SessionMiddleware（同樣支援同步與 async）"""
+
+    def process_response(self, request, response):
+        if is_readonly_request(request):
+            return response
+        session = request.session
+        if session.accessed and not session.is_empty():
+            now = int(time.time())
+            if session.modified or now - session.get(REFRESHED_KEY, 0) >= settings.SESSION_REFRESH_AFTER:
+                session[REFRESHED_KEY] = now  # 標記為已修改，由 Django 存檔並更新 cookie 期限
+        return super().process_response(request, response)
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """分批刪除過期的 session，避免一次鎖住整張表；signed cookie 等不存資料庫的 backend 回傳 0"""
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(store, "get_model_class"):
+        return 0
+    model = store.get_model_class()
+    deleted = 0
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=timezone.now()).values_list("session_key", flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += model.objects.filter(session_key__in=keys).delete()[0]
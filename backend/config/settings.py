@@ -14,8 +14,11 @@ import os
 from pathlib import Path
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
+from config import db_pool
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -58,9 +61,10 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.db_router.ReplicaRoutingMiddleware',  # 讀寫分離（未設定 replica 時不影響路由）
     'corsheaders.middleware.CorsMiddleware',  # 必須在 CommonMiddleware 之前
     'whitenoise.middleware.WhiteNoiseMiddleware',  # 靜態檔案服務（生產環境）
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'config.sessions.SessionMiddleware',  # 只在內容改變或接近過期時寫入 session
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -68,6 +72,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 唯讀端點（商品、標籤、訂單查詢）使用原生 async view；config/asgi.py 預設開啟，WSGI 維持同步版
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+if ASYNC_VIEWS:
+    # WhiteNoise 只支援同步，留在 middleware 中每個請求都會被轉成同步執行；
+    # ASGI 下靜態檔改由 config/asgi.py 的 ASGIStaticFilesHandler 提供
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# 請求效能量測（Server-Timing + /api/admin/metrics/），設定 REQUEST_METRICS=True 啟用
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', 'False') == 'True'
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, 'config.instrumentation.RequestMetricsMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -106,6 +122,8 @@ if DATABASE_URL:
         if 'ENGINE' in db_config and 'postgresql' in db_config['ENGINE']:
             # Force use of psycopg3 adapter
             db_config['OPTIONS'] = db_config.get('OPTIONS', {})
+        # 連線池或持久連線（見 config/db_pool.py）
+        db_config = db_pool.configure(db_config)
         DATABASES = {
             'default': db_config
         }
@@ -126,6 +144,61 @@ else:
     }
 
 
+# 讀取副本（選用）：DATABASE_REPLICA_URLS 以逗號分隔多個，或只設定一個 DATABASE_REPLICA_URL
+# 商品 / 標籤 / 後台訂單列表的讀取分散到 replica，寫入與其他讀取仍走 default（見 config/db_router.py）
+replica_urls_str = os.environ.get('DATABASE_REPLICA_URLS', os.environ.get('DATABASE_REPLICA_URL', ''))
+DATABASE_REPLICAS = []
+for i, url in enumerate(u.strip() for u in replica_urls_str.split(',') if u.strip()):
+    alias = f'replica_{i}'
+    DATABASES[alias] = db_pool.configure(dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True))
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}  # 測試時與 default 共用同一個資料庫
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+# 寫入後同一個用戶端改讀 primary 的秒數，需大於 replica 的同步延遲
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', '15'))
+
+
+# Cache
+# 有設定 REDIS_URL 時多個 worker 共用同一份 cache，否則使用本機記憶體（各 process 各一份）
+REDIS_URL = os.environ.get('REDIS_URL', '').strip()
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'market',
+        }
+    }
+
+# 目錄、商店設定的版本號保存秒數（見 store/cache_versions.py）：共用 cache 不過期；
+# 本機記憶體 cache 其他 worker 收不到遞增，版本號短時間過期後重新載入，變動最多延遲這麼久
+CACHE_VERSION_TTL = None if REDIS_URL else int(os.environ.get('CACHE_VERSION_TTL', '5'))
+
+
+# 下單 API 的 Idempotency-Key：紀錄保存秒數，以及重複請求等待處理中請求的最長秒數
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 10))
+
+
+# 限流（token bucket 存在上面的 cache，見 store/throttling.py）：格式同 DRF，次數即可連續使用的額度，空字串代表不限
+STORE_THROTTLE_RATES = {
+    'browse': os.environ.get('THROTTLE_BROWSE_RATE', '120/min'),  # 每個 IP：訂單查詢、下單佇列輪詢
+    'checkout': os.environ.get('THROTTLE_CHECKOUT_RATE', '20/min'),  # 每個 IP：下單
+    'checkout_phone': os.environ.get('THROTTLE_CHECKOUT_PHONE_RATE', '5/min'),  # 每個手機號碼：下單
+}
+
+
+# 下單佇列模式（搶購時削峰）：下單 API 回 202 + ticket，由 manage.py run_order_worker 批次建立訂單
+ORDER_INTAKE_QUEUED = os.environ.get('ORDER_INTAKE_QUEUED', 'False') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -193,6 +266,18 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.AllowAny"],
+    # orjson 編碼 / 解析，輸出與 DRF 原本的 JSONRenderer 相同；未安裝 orjson 時自動退回 stdlib json
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # 前面有幾層反向代理（Render 為 1）；限流依 X-Forwarded-For 取得用戶端 IP
+    "NUM_PROXIES": int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,
 }
 
 # Session 安全設定（資安強化）
@@ -200,7 +285,14 @@ SESSION_COOKIE_HTTPONLY = True  # 防止 JavaScript 存取 Session Cookie
 SESSION_COOKIE_SECURE = not DEBUG  # 生產環境（HTTPS）設為 True，開發環境（HTTP）設為 False
 SESSION_COOKIE_SAMESITE = "None" if not DEBUG else "Lax"  # 跨站需要 None，開發環境用 Lax
 SESSION_COOKIE_AGE = 86400  # Session 過期時間：24 小時（秒）
-SESSION_SAVE_EVERY_REQUEST = True  # 每次請求都更新 Session 過期時間
+SESSION_SAVE_EVERY_REQUEST = False  # 不在每個請求寫入；改由 config/sessions.py 在接近過期時延長
+SESSION_REFRESH_AFTER = int(os.environ.get('SESSION_REFRESH_AFTER', SESSION_COOKIE_AGE // 2))  # 距上次寫入超過此秒數才延長
+SESSION_READONLY_PATHS = ('/api/products/', '/api/tags/')  # 這些路徑的 GET 不存 session
+# 有 Redis 時讀取走 cache（寫入仍同步寫資料庫）；本機記憶體 cache 各 process 不共用，登出後其他 worker 仍可能讀到舊 session，所以只用資料庫
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # 關閉瀏覽器不立即過期（使用 SESSION_COOKIE_AGE）
 
 # CSRF 保護設定
@@ -215,6 +307,7 @@ CSRF_TRUSTED_ORIGINS = [
 
 # CORS 設定（允許認證）
 CORS_ALLOW_CREDENTIALS = True  # 允許傳送 Cookie（Session）
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")  # 下單 API 的 Idempotency-Key
 
 # 安全性：僅允許白名單的 origin（CORS_ALLOWED_ORIGINS）
 # 不要開啟 CORS_ALLOW_ALL_ORIGINS = True，否則任何網站都能存取 API
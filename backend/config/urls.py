@@ -17,10 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from config.instrumentation import metrics_view
 from store.views import ApiRootView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/admin/metrics/', metrics_view, name='admin-metrics'),
     path('api/', include('store.urls')),
     path('', ApiRootView.as_view(), name='api-root'),
 ]
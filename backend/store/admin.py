@@ -1,5 +1,11 @@
+from collections import Counter
+
 from django.contrib import admin
-from .models import Tag, Product, ProductVariant, Order, OrderItem, ShopSettings
+from django.db.models import Count, Prefetch
+
+from . import order_status
+from .models import Tag, Product, ProductVariant, Order, OrderItem, OrderStatusHistory, ShopSettings
+from .pagination import EstimatedCountPaginator
 
 # 自訂 Django Admin 標題
 admin.site.site_header = '阿立小舖 後台管理'
@@ -19,16 +25,16 @@ class ProductVariantInline(admin.TabularInline):
     """商品規格 - 內嵌在商品編輯頁面"""
     model = ProductVariant
     extra = 1
-    fields = ['name', 'price', 'image_url', 'is_active', 'order']
+    fields = ['name', 'price', 'stock', 'image_url', 'is_active', 'order']
     ordering = ['order', 'id']
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     """商品管理"""
-    list_display = ['id', 'name', 'price', 'is_active', 'get_tags', 'get_variants_count']
+    list_display = ['id', 'sku', 'name', 'price', 'is_active', 'get_tags', 'get_variants_count']
     list_filter = ['is_active', 'tags']
-    search_fields = ['name', 'description']
+    search_fields = ['sku', 'name', 'description']
     list_editable = ['is_active']
     filter_horizontal = ['tags']
     inlines = [ProductVariantInline]
@@ -36,7 +42,7 @@ class ProductAdmin(admin.ModelAdmin):
     
     fieldsets = [
         ('基本資訊', {
-            'fields': ['name', 'price', 'is_active']
+            'fields': ['sku', 'name', 'price', 'stock', 'is_active']
         }),
         ('圖片與描述', {
             'fields': ['image_url', 'description']
@@ -46,13 +52,19 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     ]
     
+    def get_queryset(self, request):
+        # 列表每列的標籤與規格數量一次取出，查詢數不隨每頁筆數增加
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('name'))
+        ).annotate(variants_count=Count('variants', distinct=True))
+
     @admin.display(description='標籤')
     def get_tags(self, obj):
         return ', '.join([tag.name for tag in obj.tags.all()])
     
-    @admin.display(description='規格數量')
+    @admin.display(description='規格數量', ordering='variants_count')
     def get_variants_count(self, obj):
-        return obj.variants.count()
+        return obj.variants_count
 
 
 class OrderItemInline(admin.TabularInline):
@@ -66,6 +78,18 @@ class OrderItemInline(admin.TabularInline):
         return False
 
 
+class OrderStatusHistoryInline(admin.TabularInline):
+    """狀態變更紀錄（唯讀）"""
+    model = OrderStatusHistory
+    extra = 0
+    fields = ['from_status', 'to_status', 'changed_by', 'created_at']
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """訂單管理"""
@@ -75,9 +99,13 @@ class OrderAdmin(admin.ModelAdmin):
     list_editable = ['status']
     readonly_fields = ['order_no', 'customer_name', 'customer_phone', 'pickup_store_address', 
                        'total_amount', 'created_at', 'updated_at']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusHistoryInline]
+    actions = ['confirm_orders', 'cancel_orders']
     ordering = ['-created_at']
-    date_hierarchy = 'created_at'
+    # 訂單表很大：不做全表 COUNT(*)（見 EstimatedCountPaginator）；
+    # 不用 date_hierarchy（每次載入都要對全表取日期範圍），以 created_at 篩選器代替
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = [
         ('訂單資訊', {
@@ -92,6 +120,27 @@ class OrderAdmin(admin.ModelAdmin):
         # 訂單只能由前台建立，後台不能手動新增
         return False
 
+    def save_model(self, request, obj, form, change):
+        obj._changed_by = request.user  # 寫入狀態紀錄（signals.py）
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='確認選取的訂單', permissions=['change'])
+    def confirm_orders(self, request, queryset):
+        self._transition(request, queryset, Order.Status.CONFIRMED)
+
+    @admin.action(description='取消選取的訂單（歸還庫存）', permissions=['change'])
+    def cancel_orders(self, request, queryset):
+        self._transition(request, queryset, Order.Status.CANCELLED)
+
+    def _transition(self, request, queryset, to_status):
+        # 批次 UPDATE，不逐筆存檔（見 order_status.py）
+        counts = Counter(o.result for o in order_status.transition(queryset, to_status, request.user))
+        self.message_user(
+            request,
+            f'已變更 {counts[order_status.CHANGED]} 筆，原本即為此狀態 {counts[order_status.UNCHANGED]} 筆，'
+            f'狀態不允許變更 {counts[order_status.INVALID]} 筆',
+        )
+
 
 @admin.register(ShopSettings)
 class ShopSettingsAdmin(admin.ModelAdmin):
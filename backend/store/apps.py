@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .shop_settings import ensure_shop_settings
+
+        post_migrate.connect(ensure_shop_settings, sender=self)
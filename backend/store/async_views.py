@@ -0,0 +1,148 @@
+"""
+唯讀端點的原生 async 版本（ASGI 用）：TagListView、ProductListView、ProductDetailView、OrderDetailView。
+
+DRF 的 view 都是同步的，在 ASGI 下每個請求都要進 sync_to_async 的執行緒池，慢速用戶端會佔住執行緒。
+這裡改用 Django 的 async view：
+- 查詢使用 async ORM（aget / async for），cache 使用 aget；快照與設定命中時完全不進執行緒池
+- 大量資料的 JSON 編碼屬於 CPU 工作，以 sync_to_async(thread_sensitive=False) 移出 event loop
+- 回應內容與同步版相同（同一個 renderer、同樣的分頁 / fields / 條件式 GET）
+
+config/asgi.py 預設 ASYNC_VIEWS=True，store/urls.py 依此選用這裡的 view；WSGI 維持同步版。
+"""
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import catalog, shop_settings, throttling
+from .models import Order, Product, Tag
+from .pagination import ProductCursorPagination
+from .serializers import OrderSerializer, ProductSerializer, TagSerializer
+from .views import _extras_for_order, _requested_fields
+
+
+def _render(data) -> tuple[bytes, str]:
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    return renderer.render(data), content_type
+
+
+async def _json_response(data, status_code: int = status.HTTP_200_OK, offload: bool = False) -> HttpResponse:
+    """offload=True 時在執行緒池編碼（商品列表這類大回應），避免卡住 event loop"""
+    if offload:
+        content, content_type = await sync_to_async(_render, thread_sensitive=False)(data)
+    else:
+        content, content_type = _render(data)
+    return HttpResponse(content, status=status_code, content_type=content_type)
+
+
+class AsyncAPIView(View):
+    """只處理 GET；DRF 的 APIException 轉成與 DRF 相同的 {"detail": ...} 回應（限流時帶 Retry-After）"""
+
+    http_method_names = ["get", "head", "options"]
+    throttle_classes = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            for throttle_class in self.throttle_classes:
+                wait = await throttling.aconsume(throttle_class().get_buckets(request))
+                if wait:
+                    raise exceptions.Throttled(wait)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as e:
+            response = await _json_response({"detail": e.detail}, status_code=e.status_code)
+            if getattr(e, "wait", None):
+                response.headers["Retry-After"] = "%d" % e.wait
+            return response
+
+
+class CatalogConditionalView(AsyncAPIView):
+    """
+    對應 views.CatalogConditionalMixin：目錄版本沒變時直接回 304。
+    子類別實作 `async def build(self, request, **kwargs) -> HttpResponse` 產生 200 的回應
+    """
+
+    async def get(self, request, *args, **kwargs):
+        etag = await catalog.aget_etag()
+        last_modified = await catalog.aget_last_modified()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            try:
+                response = await self.build(request, *args, **kwargs)
+            except exceptions.APIException as e:
+                response = await _json_response({"detail": e.detail}, status_code=e.status_code)
+            if response.status_code == status.HTTP_200_OK:
+                response.headers["ETag"] = etag
+                if timestamp is not None:
+                    response.headers["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class TagListView(CatalogConditionalView):
+
+    async def build(self, request):
+        tags = [tag async for tag in Tag.objects.order_by("name")]
+        return await _json_response(TagSerializer(tags, many=True).data)
+
+
+class ProductListView(CatalogConditionalView):
+
+    async def build(self, request):
+        request = Request(request)  # 分頁與 fields 需要 query_params
+        tags_param = request.query_params.get("tags", "").strip()
+        tag_names = [t.strip() for t in tags_param.split(",") if t.strip()]
+        search = request.query_params.get("search", "").strip()
+
+        products = await catalog.aget_active_products()
+        if search:
+            # 全文索引查詢走原生 cursor，沒有 async 版本
+            products = await sync_to_async(catalog.search_products)(products, search)
+        products = catalog.filter_by_tags(products, tag_names)
+
+        paginator = ProductCursorPagination()
+        page = paginator.paginate_queryset(products, request)
+        if page is not None:
+            products = page
+
+        fields = _requested_fields(request)
+        if fields:
+            products = [{k: p[k] for k in fields if k in p} for p in products]
+
+        data = paginator.get_paginated_response(products).data if page is not None else products
+        return await _json_response(data, offload=True)
+
+
+class ProductDetailView(CatalogConditionalView):
+
+    async def build(self, request, pk):
+        queryset = Product.objects.filter(is_active=True).prefetch_related("tags", "variants")
+        try:
+            product = await queryset.aget(pk=pk)
+        except Product.DoesNotExist:
+            # 與 DRF 的 get_object_or_404 訊息相同
+            raise exceptions.NotFound("No Product matches the given query.")
+        return await _json_response(ProductSerializer(product).data)
+
+
+class OrderDetailView(AsyncAPIView):
+    throttle_classes = (throttling.BrowseThrottle,)
+
+    async def get(self, request, order_no):
+        try:
+            order = await Order.objects.prefetch_related("items").aget(order_no=order_no)
+        except Order.DoesNotExist:
+            raise exceptions.NotFound("No Order matches the given query.")
+        data = OrderSerializer(order).data
+        data.update(_extras_for_order(order, await shop_settings.aget_settings()))
+        return await _json_response(data)
@@ -0,0 +1,137 @@
+"""
+存在 cache 裡的版本號：資料變動時遞增，快取內容以版本號為 key。
+
+多個 worker 共用同一個 cache（REDIS_URL）時，任何一個 worker 遞增版本，其他 worker 下一個請求就會看到。
+沒有 Redis 時各 process 的本機記憶體 cache 不共用，版本號只保存 CACHE_VERSION_TTL 秒，
+過期後換新版本重新載入，其他 worker 最多延遲這麼久看到變動。
+版本號當 ETag 用時傳入 initial（由資料內容算出的值）：內容沒變，過期後的版本號與其他 worker 都相同。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+BUMPED_AT_KEY = "{key}:bumped_at"
+
+
+def _initial_version() -> int:
+    """以奈秒時間當初始版本，cache 被清空或版本號過期後也不會撞到舊資料的 key"""
+    return time.time_ns()
+
+
+def get_version(key: str, initial: Callable[[], int] = _initial_version) -> int:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial(), timeout=settings.CACHE_VERSION_TTL)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key: str, initial: Callable[[], int] = _initial_version) -> int:
+    """get_version 的 async 版本（ASGI view 用）"""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, await sync_to_async(initial)(), timeout=settings.CACHE_VERSION_TTL)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key: str, initial: Callable[[], int] = _initial_version) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key 不存在（cache 重啟、被清空或已過期）
+        cache.add(key, initial(), timeout=settings.CACHE_VERSION_TTL)
+    # 刪除沒有 updated_at 可查，所以修改時間由這裡記錄
+    cache.set(BUMPED_AT_KEY.format(key=key), timezone.now(), timeout=settings.CACHE_VERSION_TTL)
+
+
+def bump_version_on_commit(key: str, initial: Callable[[], int] = _initial_version) -> None:
+    """交易提交後才遞增，避免其他請求在提交前用舊資料重建新版本的快取"""
+    transaction.on_commit(lambda: bump_version(key, initial))
+
+
+def bumped_at(key: str, default: Callable[[], Any] | None = None):
+    """最後一次遞增的時間；cache 沒有記錄時以 default() 估計並存回 cache（仍為 None 時不存）"""
+    cache_key = BUMPED_AT_KEY.format(key=key)
+    value = cache.get(cache_key)
+    if value is None and default is not None:
+        value = default()
+        if value is not None:
+            cache.add(cache_key, value, timeout=settings.CACHE_VERSION_TTL)
+    return value
+
+
+async def abumped_at(key: str):
+    """只讀 cache；沒有記錄時呼叫端再以 bumped_at 估計"""
+    return await cache.aget(BUMPED_AT_KEY.format(key=key))
+
+
+class VersionedValue:
+    """
+    以版本號為 key 存在 cache 的值，每個 process 另外保留目前版本解碼後的物件：
+    版本沒變就不碰 cache 內容，也不重新載入或解碼。
+    initial 為版本號不存在時的初始值（預設為目前時間）。
+    """
+
+    def __init__(
+        self,
+        version_key: str,
+        data_key: str,
+        load: Callable[[], Any],
+        decode: Callable[[Any], Any] = lambda raw: raw,
+        timeout: int | None = None,
+        initial: Callable[[], int] = _initial_version,
+    ):
+        self.version_key = version_key
+        self.data_key = data_key  # 含 {version} 的格式字串
+        self.load = load  # 回傳要存進 cache 的值
+        self.decode = decode  # cache 中的值 → 每個 process 保留的物件
+        self.timeout = timeout
+        self.initial = initial
+        self._local: tuple[int | None, Any] = (None, None)
+        self._lock = threading.Lock()
+
+    def get_version(self) -> int:
+        return get_version(self.version_key, self.initial)
+
+    async def aget_version(self) -> int:
+        return await aget_version(self.version_key, self.initial)
+
+    def get(self):
+        version = self.get_version()
+        local_version, value = self._local
+        if local_version == version:
+            return value
+
+        with self._lock:
+            local_version, value = self._local
+            if local_version == version:
+                return value
+            key = self.data_key.format(version=version)
+            raw = cache.get(key)
+            if raw is None:
+                raw = self.load()
+                # 版本號會過期時，舊版本的內容不會再被讀到，跟著版本號一起過期
+                cache.set(key, raw, timeout=settings.CACHE_VERSION_TTL or self.timeout)
+            value = self.decode(raw)
+            self._local = (version, value)
+        return value
+
+    async def aget(self):
+        """get 的 async 版本：版本沒變時只有一次 cache 讀取，不進執行緒池"""
+        version = await self.aget_version()
+        local_version, value = self._local
+        if local_version == version:
+            return value
+        return await sync_to_async(self.get)()
+
+    def invalidate(self) -> None:
+        bump_version_on_commit(self.version_key, self.initial)
@@ -0,0 +1,117 @@
+"""
+商品目錄快照：把上架商品整包序列化後放進 cache，以版本號控制失效。
+
+- 版本號存在 cache，任何 Product / ProductVariant / Tag 變動都會遞增（見 signals.py）
+- 快照以版本號為 key，舊版本自然失效，不需要逐一刪除
+- 每個 process 另外保留一份已解析的快照，版本沒變就不碰 cache 內容
+- 版本號同時作為 ETag，遞增的時間供 Last-Modified 使用（見 cache_versions.py）
+- 版本號的初始值由目錄內容算出：本機記憶體 cache 的版本號過期後，內容沒變 ETag 就不變，各 worker 也相同
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, Prefetch
+
+from config.db_router import use_primary
+
+from . import cache_versions, fast_serializers, search
+from .models import Product, ProductVariant, Tag
+
+VERSION_KEY = "store:catalog:version"
+SNAPSHOT_KEY = "store:catalog:snapshot:{version}"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def invalidate() -> None:
+    """商品、規格、標籤有變動時呼叫（見 signals.py），交易提交後換新版本"""
+    _snapshot.invalidate()
+
+
+def get_etag() -> str:
+    return f'"catalog-{_snapshot.get_version()}"'
+
+
+def _last_updated_at():
+    candidates = [model.objects.aggregate(m=Max("updated_at"))["m"] for model in (Product, ProductVariant, Tag)]
+    return max((c for c in candidates if c is not None), default=None)
+
+
+def get_last_modified():
+    """目錄最後修改時間；cache 沒有時才從三張表的 updated_at 取最大值"""
+    return cache_versions.bumped_at(VERSION_KEY, default=_last_updated_at)
+
+
+async def aget_etag() -> str:
+    return f'"catalog-{await _snapshot.aget_version()}"'
+
+
+async def aget_last_modified():
+    last_modified = await cache_versions.abumped_at(VERSION_KEY)
+    if last_modified is None:
+        return await sync_to_async(get_last_modified)()
+    return last_modified
+
+
+def active_products_queryset():
+    # 標籤明確依 id 排序，快照內容才穩定（fast_serializers 也用同樣的順序）
+    tags = Prefetch("tags", queryset=Tag.objects.order_by("id"))
+    return Product.objects.filter(is_active=True).prefetch_related(tags, "variants").order_by("id")
+
+
+def build_snapshot() -> str:
+    # 快照會以目前版本快取到下次修改為止，從 replica 讀到尚未同步的資料會一直留著，一律讀 primary
+    with use_primary():
+        return json.dumps(fast_serializers.products(active_products_queryset()), ensure_ascii=False)
+
+
+def content_version() -> int:
+    """
+    由三張表與商品標籤關聯的筆數、最後修改時間算出的版本號初始值：新增、修改、刪除都會改變。
+    取 56 bits，之後遞增也不會超出 64 位元整數
+    """
+    with use_primary():
+        parts = [
+            model.objects.aggregate(n=Count("pk"), m=Max("updated_at"))
+            for model in (Product, ProductVariant, Tag)
+        ]
+        parts.append(Product.tags.through.objects.aggregate(n=Count("pk"), m=Max("pk")))
+    digest = hashlib.blake2b(repr([(p["n"], p["m"]) for p in parts]).encode(), digest_size=7).digest()
+    return int.from_bytes(digest, "big")
+
+
+_snapshot = cache_versions.VersionedValue(
+    VERSION_KEY, SNAPSHOT_KEY, build_snapshot, json.loads, SNAPSHOT_TIMEOUT, initial=content_version
+)
+
+
+def get_active_products() -> list[dict]:
+    """取得上架商品的序列化結果（唯讀，呼叫端不可修改）"""
+    return _snapshot.get()
+
+
+async def aget_active_products() -> list[dict]:
+    return await _snapshot.aget()
+
+
+def search_products(products: list[dict], text: str) -> list[dict]:
+    """用全文索引找出符合的商品並依相關度排序；資料庫不支援時退回子字串比對"""
+    ranked_ids = search.search_product_ids(text)
+    if ranked_ids is None:
+        needle = text.casefold()
+        return [
+            p for p in products
+            if needle in p["name"].casefold() or needle in p["description"].casefold()
+        ]
+    by_id = {p["id"]: p for p in products}
+    return [by_id[pid] for pid in ranked_ids if pid in by_id]
+
+
+def filter_by_tags(products: list[dict], tag_names: list[str]) -> list[dict]:
+    """在記憶體中套用標籤篩選，語意對應原本的 tags__name__in"""
+    if not tag_names:
+        return products
+    wanted = set(tag_names)
+    return [p for p in products if any(t["name"] in wanted for t in p["tags"])]
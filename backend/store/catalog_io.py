@@ -0,0 +1,267 @@
+"""
+商品目錄批次匯入 / 匯出（import_catalog / export_catalog 指令共用）。
+
+兩種格式表示同一份資料，以 sku 作為商品的對應鍵（沒有 sku 的商品自動補上 ID-<id>，見 fill_missing_skus）：
+- JSON Lines：每行一個商品，規格與標籤內嵌
+  {"sku", "name", "price", "is_active", "image_url", "description", "tags": [...], "variants": [{...}]}
+- CSV：每行一個規格，同一商品的多行必須相鄰；沒有規格的商品 variant_name 留空；標籤以 | 分隔
+
+全程串流處理：讀一批、寫一批，記憶體用量與檔案大小無關。
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import json
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterable, Iterator
+
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from . import catalog, search
+from .models import Product, ProductVariant, Tag
+
+CSV_COLUMNS = [
+    "sku", "name", "price", "is_active", "image_url", "description", "tags",
+    "variant_name", "variant_price", "variant_image_url", "variant_is_active", "variant_order",
+]
+PRODUCT_FIELDS = ["name", "price", "is_active", "image_url", "description"]
+VARIANT_FIELDS = ["price", "image_url", "is_active", "order"]
+TAG_SEPARATOR = "|"
+DEFAULT_SKU_PREFIX = "ID-"
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def fill_missing_skus(products=None) -> int:
+    """替沒有 sku 的商品補上 ID-<id>（單一 UPDATE），匯出的檔案才能再匯入；回傳補上的商品數"""
+    if products is None:
+        products = Product.objects.all()
+    return products.filter(sku__isnull=True).update(
+        sku=Concat(Value(DEFAULT_SKU_PREFIX), Cast("pk", CharField()))
+    )
+
+
+def _price(value, where: str) -> Decimal:
+    """價格欄位沒有小數位數：只接受有限的整數（120、"120"、"120.0"）"""
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise CatalogFormatError(f"{where}: 價格格式錯誤 {value!r}")
+    if not price.is_finite() or price != price.to_integral_value():
+        raise CatalogFormatError(f"{where}: 價格必須是整數 {value!r}")
+    return price.quantize(Decimal(1))
+
+
+def _variant(value, position: int, where: str) -> dict:
+    if not isinstance(value, dict):
+        raise CatalogFormatError(f"{where}: 規格格式錯誤 {value!r}")
+    if not value.get("name"):
+        raise CatalogFormatError(f"{where}: 規格缺少名稱")
+    order = value.get("order")
+    if order in (None, ""):
+        order = position  # 明確的 0 要保留
+    elif str(order).strip().isdecimal():
+        order = int(order)
+    else:
+        raise CatalogFormatError(f"{where}: 規格排序必須是非負整數 {order!r}")
+    return {
+        "name": value["name"],
+        "price": _price(value.get("price"), where),
+        "image_url": value.get("image_url") or "",
+        "is_active": _bool(value.get("is_active", True)),
+        "order": order,
+    }
+
+
+# ========== 讀取 ==========
+
+
+def _normalize(record: dict, where: str) -> dict:
+    if not isinstance(record, dict):
+        raise CatalogFormatError(f"{where}: 每行必須是一個 JSON 物件")
+    sku = str(record.get("sku") or "").strip()
+    if not sku:
+        raise CatalogFormatError(f"{where}: 缺少 sku")
+    if not record.get("name"):
+        raise CatalogFormatError(f"{where}: 缺少商品名稱")
+    return {
+        "sku": sku,
+        "name": record["name"],
+        "price": _price(record.get("price"), where),
+        "is_active": _bool(record.get("is_active", True)),
+        "image_url": record.get("image_url") or "",
+        "description": record.get("description") or "",
+        "tags": [t.strip() for t in record.get("tags") or [] if t.strip()],
+        "variants": [_variant(v, i, where) for i, v in enumerate(record.get("variants") or [])],
+    }
+
+
+def _read_jsonl(fp: IO[str]) -> Iterator[dict]:
+    for lineno, line in enumerate(fp, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise CatalogFormatError(f"第 {lineno} 行: JSON 格式錯誤 ({e})")
+        yield _normalize(record, f"第 {lineno} 行")
+
+
+def _read_csv(fp: IO[str]) -> Iterator[dict]:
+    reader = csv.DictReader(fp)
+    for sku, rows in itertools.groupby(reader, key=lambda r: (r.get("sku") or "").strip()):
+        rows = list(rows)
+        first = rows[0]
+        record = dict(first)
+        record["tags"] = (first.get("tags") or "").split(TAG_SEPARATOR)
+        record["variants"] = [
+            {
+                "name": r["variant_name"],
+                "price": r.get("variant_price"),
+                "image_url": r.get("variant_image_url"),
+                "is_active": r.get("variant_is_active") or True,
+                "order": r.get("variant_order"),
+            }
+            for r in rows
+            if (r.get("variant_name") or "").strip()
+        ]
+        yield _normalize(record, f"第 {reader.line_num} 行（sku={sku}）")
+
+
+def read_records(fp: IO[str], fmt: str) -> Iterator[dict]:
+    return _read_csv(fp) if fmt == "csv" else _read_jsonl(fp)
+
+
+# ========== 匯入 ==========
+
+
+class CatalogImporter:
+    """每批一個交易；標籤名稱 → id 的對照表整個匯入過程只建一次"""
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.tag_ids: dict[str, int] = dict(Tag.objects.values_list("name", "id"))
+        self.products = 0
+        self.variants = 0
+
+    def run(self, records: Iterable[dict]) -> None:
+        records = iter(records)
+        try:
+            while batch := list(itertools.islice(records, self.batch_size)):
+                self._import_batch(batch)
+        finally:
+            # 中途失敗時已提交的批次也要反映到目錄快照
+            catalog.invalidate()
+
+    def _resolve_tags(self, batch: list[dict]) -> None:
+        new_names = {name for r in batch for name in r["tags"]} - self.tag_ids.keys()
+        if not new_names:
+            return
+        Tag.objects.bulk_create([Tag(name=n) for n in new_names], ignore_conflicts=True)
+        self.tag_ids.update(Tag.objects.filter(name__in=new_names).values_list("name", "id"))
+
+    @transaction.atomic
+    def _import_batch(self, batch: list[dict]) -> None:
+        # 同一個 upsert 語句不能更新同一列兩次：同 sku / 同規格名稱以後出現的為準
+        batch = list({r["sku"]: r for r in batch}.values())
+        for r in batch:
+            r["variants"] = list({v["name"]: v for v in r["variants"]}.values())
+        self._resolve_tags(batch)
+
+        Product.objects.bulk_create(
+            [Product(sku=r["sku"], **{f: r[f] for f in PRODUCT_FIELDS}) for r in batch],
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=[*PRODUCT_FIELDS, "updated_at"],
+        )
+        products = {p.sku: p for p in Product.objects.filter(sku__in=[r["sku"] for r in batch])}
+
+        ProductVariant.objects.bulk_create(
+            [
+                ProductVariant(product=products[r["sku"]], name=v["name"], **{f: v[f] for f in VARIANT_FIELDS})
+                for r in batch
+                for v in r["variants"]
+            ],
+            update_conflicts=True,
+            unique_fields=["product", "name"],
+            update_fields=[*VARIANT_FIELDS, "updated_at"],
+        )
+
+        product_ids = [p.id for p in products.values()]
+
+        # 標籤以檔案內容為準：先清掉這批商品原本的標籤再整批寫入
+        through = Product.tags.through
+        through.objects.filter(product_id__in=product_ids).delete()
+        through.objects.bulk_create(
+            [
+                through(product_id=products[r["sku"]].id, tag_id=self.tag_ids[name])
+                for r in batch
+                for name in dict.fromkeys(r["tags"])
+            ]
+        )
+
+        # bulk 寫入不會觸發 signal，手動同步搜尋索引
+        for product in products.values():
+            search.index_product(product)
+
+        self.products += len(batch)
+        self.variants += sum(len(r["variants"]) for r in batch)
+
+
+# ========== 匯出 ==========
+
+
+def iter_records(chunk_size: int = 500) -> Iterator[dict]:
+    qs = Product.objects.prefetch_related("tags", "variants").order_by("id")
+    for p in qs.iterator(chunk_size=chunk_size):
+        yield {
+            "sku": p.sku or "",
+            "name": p.name,
+            "price": str(p.price),
+            "is_active": p.is_active,
+            "image_url": p.image_url,
+            "description": p.description,
+            "tags": [t.name for t in p.tags.all()],
+            "variants": [
+                {
+                    "name": v.name,
+                    "price": str(v.price),
+                    "image_url": v.image_url,
+                    "is_active": v.is_active,
+                    "order": v.order,
+                }
+                for v in p.variants.all()
+            ],
+        }
+
+
+def write_records(records: Iterable[dict], fp: IO[str], fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(fp)
+        writer.writerow(CSV_COLUMNS)
+    for r in records:
+        count += 1
+        if fmt != "csv":
+            fp.write(json.dumps(r, ensure_ascii=False) + "\n")
+            continue
+        base = [r["sku"], r["name"], r["price"], r["is_active"], r["image_url"], r["description"],
+                TAG_SEPARATOR.join(r["tags"])]
+        variants = r["variants"] or [None]
+        for v in variants:
+            if v is None:
+                writer.writerow(base + [""] * 5)
+            else:
+                writer.writerow(base + [v["name"], v["price"], v["image_url"], v["is_active"], v["order"]])
+    return count
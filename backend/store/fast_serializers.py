@@ -0,0 +1,122 @@
+"""
+唯讀端點的快速序列化：以 .values() 取出欄位後直接組 dict，不經過 DRF 逐物件、逐欄位的 to_representation 流程。
+
+輸出必須與 serializers.py 的 ProductSerializer / OrderSerializer 完全相同（tests 有逐位元組比對）：
+- 欄位順序與巢狀結構照抄各 serializer 的 Meta.fields，修改 serializer 時這裡要一起改
+- Decimal、日期時間直接沿用該 serializer 欄位的 to_representation（模組載入時取出一次），
+  其餘字串 / 數字 / 布林欄位 .values() 取出的值已經是輸出格式，原樣放入
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from .models import OrderItem, Product, ProductVariant
+from .serializers import OrderItemSerializer, OrderSerializer, ProductSerializer, ProductVariantSerializer
+
+_PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField,
+                serializers.PrimaryKeyRelatedField)
+
+
+def _columns(serializer_class, names: list[str]) -> tuple[tuple[str, object], ...]:
+    """(欄位名稱, 轉換函式或 None)；轉換函式為 None 代表原樣輸出"""
+    fields = serializer_class().fields
+    return tuple(
+        (name, None if isinstance(fields[name], _PASSTHROUGH) else fields[name].to_representation)
+        for name in names
+    )
+
+
+def _build(row: dict, columns) -> dict:
+    # DRF 遇到 None 不呼叫 to_representation，直接輸出 null
+    return {
+        name: row[name] if convert is None or row[name] is None else convert(row[name])
+        for name, convert in columns
+    }
+
+
+# ========== 商品 ==========
+
+_PRODUCT = _columns(ProductSerializer, ["id", "name", "price", "is_active", "image_url", "description"])
+_VARIANT = _columns(ProductVariantSerializer, ["id", "name", "price", "image_url", "is_active", "order"])
+
+
+def products(queryset) -> list[dict]:
+    """
+    等同 ProductSerializer(queryset, many=True).data，固定 3 個查詢（商品、標籤、規格）。
+    商品順序依 queryset；標籤依 id、規格依 (order, id)，與 catalog.active_products_queryset 相同。
+    """
+    queryset = queryset.prefetch_related(None)
+    ids = queryset.values("id")
+
+    tags = defaultdict(list)
+    through = Product.tags.through.objects.filter(product_id__in=ids).order_by("product_id", "tag_id")
+    for product_id, tag_id, tag_name in through.values_list("product_id", "tag_id", "tag__name"):
+        tags[product_id].append({"id": tag_id, "name": tag_name})
+
+    variants = defaultdict(list)
+    variant_rows = ProductVariant.objects.filter(product_id__in=ids).values("product_id", *(n for n, _ in _VARIANT))
+    for row in variant_rows:
+        variants[row["product_id"]].append(_build(row, _VARIANT))
+
+    result = []
+    for row in queryset.values(*(n for n, _ in _PRODUCT)):
+        p = _build(row, _PRODUCT)
+        product_variants = variants.get(row["id"], [])
+        result.append({
+            "id": p["id"],
+            "name": p["name"],
+            "price": p["price"],
+            "is_active": p["is_active"],
+            "has_variants": len(product_variants) > 0,
+            "image_url": p["image_url"],
+            "description": p["description"],
+            "tags": tags.get(row["id"], []),
+            "variants": product_variants,
+        })
+    return result
+
+
+# ========== 訂單 ==========
+
+ORDER_FIELDS = [name for name in OrderSerializer.Meta.fields if name != "items"]
+_ORDER = dict(_columns(OrderSerializer, ORDER_FIELDS))
+_ITEM = _columns(OrderItemSerializer, list(OrderItemSerializer.Meta.fields))
+
+
+def _selected(fields: list[str] | None) -> list[str]:
+    """與 SparseFieldsMixin 相同：保留原本的欄位順序，忽略不存在的名稱"""
+    return [name for name in OrderSerializer.Meta.fields if not fields or name in fields]
+
+
+def order_values(queryset, fields: list[str] | None = None):
+    """
+    回傳 .values() queryset，可直接交給 OrderCursorPagination 分頁（cursor 需要的
+    created_at / id 一律取出），再用 orders() 組成輸出
+    """
+    names = [n for n in _selected(fields) if n != "items"]
+    return queryset.prefetch_related(None).values(*dict.fromkeys([*names, "id", "created_at"]))
+
+
+def orders(rows: list[dict], fields: list[str] | None = None) -> list[dict]:
+    """等同 OrderSerializer(orders, many=True, fields=fields).data；需要 items 時多 1 個查詢"""
+    selected = _selected(fields)
+    items = defaultdict(list)
+    if "items" in selected and rows:
+        item_rows = OrderItem.objects.filter(order_id__in=[r["id"] for r in rows]).order_by("order_id", "id")
+        for row in item_rows.values("order_id", *(n for n, _ in _ITEM)):
+            items[row["order_id"]].append(_build(row, _ITEM))
+
+    result = []
+    for row in rows:
+        data = {}
+        for name in selected:
+            if name == "items":
+                data[name] = items.get(row["id"], [])
+                continue
+            value, convert = row[name], _ORDER[name]
+            data[name] = value if convert is None or value is None else convert(value)
+        result.append(data)
+    return result
+
@@ -0,0 +1,122 @@
+"""
+下單 API 的 Idempotency-Key：網路不穩的用戶端重送同一張訂單時，回傳第一次的結果而不是再建一張。
+
+- 第一個帶著 key 的請求以 INSERT 佔住 key（unique 約束保證只有一個贏家），完成後把回應寫回同一列並放進 cache
+- 重送：先查 cache，沒有再查資料表；命中就直接回放，不碰商品與訂單
+- 同時抵達的重複請求：輪詢等待處理中的那一個完成，超過 IDEMPOTENCY_WAIT_SECONDS 回 RequestInProgress
+- 只保存成功的回應；失敗時刪掉佔位，讓用戶端修正後可以用同一個 key 重試
+- 紀錄保存 IDEMPOTENCY_KEY_TTL 秒，過期的由 purge_idempotency_keys 指令分批清除
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+CACHE_PREFIX = "store:idempotency:"
+MAX_KEY_LENGTH = 255
+# 處理中的佔位超過這個時間視為 worker 已中斷，允許其他請求接手
+LOCK_TIMEOUT = timedelta(seconds=60)
+
+
+class KeyReused(Exception):
+    """同一個 key 搭配了不同的請求內容"""
+
+
+class RequestInProgress(Exception):
+    """同一個 key 的請求仍在處理中，等待逾時"""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def fingerprint(payload) -> str:
+    if hasattr(payload, "lists"):  # QueryDict（表單送出）
+        payload = dict(payload.lists())
+    return _sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder))
+
+
+def _ttl() -> int:
+    return settings.IDEMPOTENCY_KEY_TTL
+
+
+@dataclass
+class Claim:
+    key: str
+    fingerprint: str
+    record_id: int | None = None
+    replay: tuple[int, dict] | None = None  # (status_code, body)：有值代表直接回放
+
+    def complete(self, status_code: int, body) -> None:
+        body = json.loads(json.dumps(body, cls=DjangoJSONEncoder))
+        IdempotencyKey.objects.filter(pk=self.record_id).update(status_code=status_code, response_body=body)
+        cache.set(CACHE_PREFIX + self.key, (self.fingerprint, status_code, body), timeout=_ttl())
+
+    def abandon(self) -> None:
+        IdempotencyKey.objects.filter(pk=self.record_id).delete()
+
+
+def _replay(key: str, fp: str, stored_fp: str, status_code: int, body) -> Claim:
+    if stored_fp != fp:
+        raise KeyReused
+    return Claim(key=key, fingerprint=fp, replay=(status_code, body))
+
+
+def begin(raw_key: str, payload) -> Claim:
+    """佔住 key 或取得先前的回應；呼叫端拿到沒有 replay 的 Claim 後必須 complete() 或 abandon()"""
+    key, fp = _sha256(raw_key), fingerprint(payload)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.02
+    while True:
+        cached = cache.get(CACHE_PREFIX + key)
+        if cached is not None:
+            return _replay(key, fp, *cached)
+
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None and record.status_code is not None and record.expires_at > now:
+            entry = (record.fingerprint, record.status_code, record.response_body)
+            cache.set(CACHE_PREFIX + key, entry, timeout=max(1, int((record.expires_at - now).total_seconds())))
+            return _replay(key, fp, *entry)
+
+        if record is None or record.expires_at <= now or record.created_at <= now - LOCK_TIMEOUT:
+            if record is not None:
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        key=key, fingerprint=fp, expires_at=now + timedelta(seconds=_ttl())
+                    )
+            except IntegrityError:
+                continue  # 被另一個請求搶先佔住，重新讀取
+            return Claim(key=key, fingerprint=fp, record_id=record.pk)
+
+        if record.fingerprint != fp:
+            raise KeyReused
+        if time.monotonic() >= deadline:
+            raise RequestInProgress
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """分批刪除過期紀錄，避免一次鎖住整張表"""
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,102 @@
+"""
+庫存扣減與歸還。
+
+stock 為 NULL 的商品 / 規格不追蹤庫存。扣減使用單一條件式 UPDATE：
+    UPDATE ... SET stock = stock - qty WHERE id = ? AND (stock IS NULL OR stock >= qty)
+不先 SELECT 再存檔，也就沒有讀到舊值的競爭問題。多個 SKU 一律依
+（商品 id → 規格 id）固定順序更新，避免兩張訂單互相等待對方的列鎖而死結。
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.db.models import F, Q
+
+from .models import Order, OrderItem, Product, ProductVariant
+from .pricing import PricedLine
+
+
+class OutOfStock(Exception):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.name = name
+
+
+def _quantities(pairs: Iterable[tuple[int | None, int | None, int]]) -> tuple[Counter, Counter]:
+    """(product_id, variant_id, qty) → 依 SKU 加總；有規格的算在規格上"""
+    by_product, by_variant = Counter(), Counter()
+    for product_id, variant_id, qty in pairs:
+        if variant_id is not None:
+            by_variant[variant_id] += qty
+        elif product_id is not None:
+            by_product[product_id] += qty
+    return by_product, by_variant
+
+
+def _sku_updates(by_product: Counter, by_variant: Counter):
+    for pid in sorted(by_product):
+        yield Product, pid, by_product[pid]
+    for vid in sorted(by_variant):
+        yield ProductVariant, vid, by_variant[vid]
+
+
+def reserved_quantity(line: PricedLine) -> int:
+    """這一行下單時會扣除的庫存（記錄在 OrderItem.reserved_qty）；下單當時不追蹤庫存的 SKU 為 0"""
+    return line.quantity if (line.variant or line.product).stock is not None else 0
+
+
+def reserve(lines: Iterable[PricedLine]) -> None:
+    """
+    扣庫存；任何一個 SKU 不足就丟出 OutOfStock，由呼叫端的交易回滾已扣的部分。
+    應在交易的最後一步呼叫，讓列鎖持有的時間盡量短。
+    """
+    # 計價時已載入 stock；不追蹤庫存的 SKU 不必下 UPDATE，查詢數只跟有庫存的 SKU 數有關
+    tracked = [line for line in lines if reserved_quantity(line)]
+    names = {
+        (ProductVariant, line.variant.id) if line.variant else (Product, line.product.id): line.name
+        for line in tracked
+    }
+    by_product, by_variant = _quantities(
+        (line.product.id, line.variant.id if line.variant else None, line.quantity) for line in tracked
+    )
+    for model, pk, qty in _sku_updates(by_product, by_variant):
+        updated = model.objects.filter(Q(stock__isnull=True) | Q(stock__gte=qty), pk=pk).update(
+            stock=F("stock") - qty
+        )
+        if not updated:
+            raise OutOfStock(names[(model, pk)])
+
+
+def release(order: Order) -> bool:
+    """
+    取消訂單時歸還下單時扣除的庫存（OrderItem.reserved_qty）。以 stock_released 旗標的條件式 UPDATE
+    確保同一張訂單只歸還一次，回傳這次是否真的歸還。
+    """
+    claimed = Order.objects.filter(pk=order.pk, stock_released=False).update(stock_released=True)
+    if not claimed:
+        return False
+    order.stock_released = True
+    items = OrderItem.objects.filter(order=order, reserved_qty__gt=0).values_list(
+        "product_id", "variant_id", "reserved_qty"
+    )
+    for model, pk, qty in _sku_updates(*_quantities(items)):
+        model.objects.filter(pk=pk, stock__isnull=False).update(stock=F("stock") + qty)
+    return True
+
+
+def release_orders(order_ids: list[int]) -> int:
+    """
+    批次取消時歸還庫存，回傳實際歸還的訂單數。呼叫端需在同一個交易內先以 select_for_update 鎖住這些訂單。
+    項目一次取出、依 SKU 加總，每個 SKU 一個 UPDATE，查詢數與訂單數無關。
+    """
+    pending = list(Order.objects.filter(id__in=order_ids, stock_released=False).values_list("id", flat=True))
+    if not pending:
+        return 0
+    Order.objects.filter(id__in=pending).update(stock_released=True)
+    items = OrderItem.objects.filter(order_id__in=pending, reserved_qty__gt=0).values_list(
+        "product_id", "variant_id", "reserved_qty"
+    )
+    for model, pk, qty in _sku_updates(*_quantities(items)):
+        model.objects.filter(pk=pk, stock__isnull=False).update(stock=F("stock") + qty)
+    return len(pending)
@@ -0,0 +1,33 @@
+"""
+benchmark_* 指令共用的工具（底線開頭，Django 不會把這個模組當成指令）
+"""
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+BENCH_ADMIN = "bench-admin"
+
+
+def require_sqlite() -> None:
+    """壓測會建立使用者、寫入 session 與訂單，只允許在本機 SQLite 執行"""
+    if connection.vendor != "sqlite":
+        raise CommandError("壓測只能對 SQLite 執行，請勿對正式資料庫執行")
+
+
+def best_of(repeat: int, fn) -> float:
+    """重複執行取最快的一次（秒），排除 GC 與其他行程的干擾"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """nearest-rank 百分位數"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
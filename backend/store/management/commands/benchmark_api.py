@@ -0,0 +1,146 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from store.management.commands._benchmark import BENCH_ADMIN, percentile, require_sqlite
+from store.models import Order, Product
+
+STAFF_ENDPOINTS = {"order_list"}
+
+
+class Command(BaseCommand):
+    help = "以 Django test client 併發壓測 store API，輸出各端點的延遲百分位數、RPS 與查詢數（JSON）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="每個端點的請求數")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--endpoints",
+            default="product_list,product_detail,order_create,order_list,order_detail",
+            help="以逗號分隔",
+        )
+        parser.add_argument("--output", help="輸出 JSON 檔案路徑（預設印到 stdout）")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        # 會建立壓測用的管理員並送出真的下單請求
+        require_sqlite()
+
+        product_ids = list(Product.objects.filter(is_active=True).values_list("id", flat=True))
+        order_nos = list(Order.objects.values_list("order_no", flat=True)[:1000])
+        if not product_ids or not order_nos:
+            raise CommandError("沒有可用的商品或訂單，請先執行 seed_benchmark_data")
+
+        self.rng = random.Random(opts["seed"])
+        self.product_ids = product_ids
+        self.order_nos = order_nos
+        self._ensure_admin()
+
+        endpoints = [e.strip() for e in opts["endpoints"].split(",") if e.strip()]
+        unknown = [e for e in endpoints if not hasattr(self, f"_req_{e}")]
+        if unknown:
+            raise CommandError(f"未知的端點: {unknown}")
+
+        report = {
+            "config": {k: opts[k] for k in ("requests", "concurrency", "seed")},
+            "dataset": {"products": len(product_ids), "orders": Order.objects.count()},
+            "endpoints": {},
+        }
+        # 壓測量的是處理請求的成本，所有請求來自同一個 IP，關閉限流
+        with override_settings(ALLOWED_HOSTS=["testserver"], STORE_THROTTLE_RATES={}):
+            for name in endpoints:
+                report["endpoints"][name] = self._run(name, opts["requests"], opts["concurrency"])
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def _ensure_admin(self):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(
+            username=BENCH_ADMIN, defaults={"is_staff": True, "is_superuser": True}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save()
+        self.admin = user
+
+    # ========== 各端點的請求 ==========
+
+    def _req_product_list(self, client: Client):
+        return client.get("/api/products/")
+
+    def _req_product_detail(self, client: Client):
+        return client.get(f"/api/products/{self.rng.choice(self.product_ids)}/")
+
+    def _req_order_create(self, client: Client):
+        items = [{"product_id": pid, "quantity": 1} for pid in self.rng.sample(self.product_ids, 3)]
+        payload = {
+            "customer_name": "壓測顧客",
+            "customer_phone": "0912345678",
+            "pickup_store_address": "壓測門市",
+            "items": items,
+        }
+        return client.post("/api/orders/create/", payload, content_type="application/json")
+
+    def _req_order_list(self, client: Client):
+        return client.get("/api/orders/")
+
+    def _req_order_detail(self, client: Client):
+        return client.get(f"/api/orders/{self.rng.choice(self.order_nos)}/")
+
+    # ========== 執行與統計 ==========
+
+    def _worker(self, name: str, count: int) -> list[tuple[float, int, int]]:
+        request = getattr(self, f"_req_{name}")
+        client = Client()
+        if name in STAFF_ENDPOINTS:
+            client.force_login(self.admin)
+        samples = []
+        try:
+            for _ in range(count):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    resp = request(client)
+                    elapsed = time.perf_counter() - start
+                samples.append((elapsed, len(ctx.captured_queries), resp.status_code))
+        finally:
+            connections.close_all()
+        return samples
+
+    def _run(self, name: str, total: int, concurrency: int) -> dict:
+        per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = pool.map(lambda n: self._worker(name, n), per_worker)
+            samples = [s for worker in results for s in worker]
+        wall = time.perf_counter() - start
+
+        latencies = sorted(s[0] * 1000 for s in samples)
+        queries = [s[1] for s in samples]
+        errors = sum(1 for s in samples if s[2] >= 400)
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "rps": round(len(samples) / wall, 1) if wall else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(latencies[-1], 2) if latencies else 0.0,
+            },
+            "queries": {
+                "mean": round(sum(queries) / len(queries), 2) if queries else 0.0,
+                "max": max(queries, default=0),
+            },
+        }
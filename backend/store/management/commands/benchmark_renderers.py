@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from config import fastjson
+from store import catalog, fast_serializers
+from store.management.commands._benchmark import best_of
+from store.models import Order, Product
+from store.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = "比較 DRF JSONRenderer 與 FastJSONRenderer（orjson）的 render 時間並確認輸出相同，輸出 JSON；請先執行 seed_benchmark_data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--orders", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        products = fast_serializers.products(catalog.active_products_queryset())
+        if not products:
+            raise CommandError("沒有上架商品，請先執行 seed_benchmark_data")
+        orders = Order.objects.order_by("-created_at", "-id").prefetch_related("items")[: opts["orders"]]
+        payloads = {
+            "products": products,
+            "orders": OrderSerializer(orders, many=True).data,
+            # 未經 serializer 的原始值：Decimal 與 datetime 由 renderer 轉換
+            "raw_product_rows": list(Product.objects.values()),
+        }
+
+        stdlib, fast = JSONRenderer(), fastjson.FastJSONRenderer()
+        report = {"config": {"repeat": opts["repeat"], "orjson": fastjson.orjson is not None}, "results": {}}
+        for name, data in payloads.items():
+            if stdlib.render(data) != fast.render(data):
+                raise CommandError(f"{name}: 兩種 renderer 的輸出不同")
+            stdlib_s = best_of(opts["repeat"], lambda: stdlib.render(data))
+            fast_s = best_of(opts["repeat"], lambda: fast.render(data))
+            report["results"][name] = {
+                "objects": len(data),
+                "bytes": len(fast.render(data)),
+                "stdlib_ms": round(stdlib_s * 1000, 2),
+                "fast_ms": round(fast_s * 1000, 2),
+                "speedup": round(stdlib_s / fast_s, 2) if fast_s else None,
+            }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
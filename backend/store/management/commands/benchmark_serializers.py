@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import catalog, fast_serializers
+from store.management.commands._benchmark import best_of
+from store.models import Order
+from store.serializers import OrderSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = "比較 DRF serializer 與 fast_serializers 的序列化速度（含查詢），輸出 JSON；請先執行 seed_benchmark_data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--orders", type=int, default=200, help="訂單列表一頁的筆數")
+
+    def handle(self, *args, **opts):
+        products = catalog.active_products_queryset()
+        product_count = products.count()
+        if not product_count:
+            raise CommandError("沒有上架商品，請先執行 seed_benchmark_data")
+
+        orders = Order.objects.order_by("-created_at", "-id")
+        order_ids = list(orders.values_list("id", flat=True)[: opts["orders"]])
+        page = orders.filter(id__in=order_ids)
+
+        cases = {
+            "products": (
+                product_count,
+                lambda: json.dumps(ProductSerializer(products.all(), many=True).data, ensure_ascii=False),
+                lambda: json.dumps(fast_serializers.products(products.all()), ensure_ascii=False),
+            ),
+            "orders": (
+                len(order_ids),
+                lambda: json.dumps(OrderSerializer(page.prefetch_related("items"), many=True).data),
+                lambda: json.dumps(fast_serializers.orders(list(fast_serializers.order_values(page)))),
+            ),
+        }
+        report = {"config": {"repeat": opts["repeat"]}, "results": {}}
+        for name, (count, drf, fast) in cases.items():
+            if not count:
+                continue
+            drf_s, fast_s = best_of(opts["repeat"], drf), best_of(opts["repeat"], fast)
+            report["results"][name] = {
+                "objects": count,
+                "drf_ms": round(drf_s * 1000, 2),
+                "fast_ms": round(fast_s * 1000, 2),
+                "drf_per_sec": round(count / drf_s),
+                "fast_per_sec": round(count / fast_s),
+                "speedup": round(drf_s / fast_s, 2),
+            }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,91 @@
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from store.management.commands._benchmark import BENCH_ADMIN, require_sqlite
+from store.models import Product
+
+# 原本的設定：Django 的 SessionMiddleware + 每個請求都存 session
+LEGACY = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+    "SESSION_SAVE_EVERY_REQUEST": True,
+    "MIDDLEWARE": [
+        "django.contrib.sessions.middleware.SessionMiddleware" if m == "config.sessions.SessionMiddleware" else m
+        for m in settings.MIDDLEWARE
+    ],
+}
+
+
+class _SessionQueries:
+    """依 SQL 種類（SELECT / INSERT / UPDATE / DELETE）計算對 django_session 的查詢數"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if "django_session" in sql:
+            self.counts[sql.lstrip().split(None, 1)[0].upper()] += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "比較原本（每個請求都存 session）與目前 session 策略的 django_session 讀寫次數，輸出 JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="每種用戶的請求數")
+
+    def handle(self, *args, **opts):
+        # 會建立壓測用的管理員與 session
+        require_sqlite()
+
+        self.product_ids = list(Product.objects.filter(is_active=True).values_list("id", flat=True)[:100])
+        if not self.product_ids:
+            raise CommandError("沒有上架商品，請先執行 seed_benchmark_data")
+        self.admin, _ = get_user_model().objects.get_or_create(
+            username=BENCH_ADMIN, defaults={"is_staff": True, "is_superuser": True}
+        )
+
+        report = {"config": {"requests": opts["requests"], "session_engine": settings.SESSION_ENGINE}, "results": {}}
+        for name, overrides in (("legacy", LEGACY), ("current", {})):
+            with override_settings(ALLOWED_HOSTS=["testserver"], STORE_THROTTLE_RATES={}, **overrides):
+                report["results"][name] = {
+                    "storefront": self._run(opts["requests"], staff=False),
+                    "staff": self._run(opts["requests"], staff=True),
+                }
+        for user in ("storefront", "staff"):
+            legacy = report["results"]["legacy"][user]["writes"]
+            current = report["results"]["current"][user]["writes"]
+            report["results"].setdefault("write_reduction", {})[user] = (
+                round(1 - current / legacy, 3) if legacy else None
+            )
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def _run(self, count: int, staff: bool) -> dict:
+        """前台：取得 CSRF token 後瀏覽商品；後台：登入後瀏覽商品、標籤與訂單列表"""
+        client = Client()
+        if staff:
+            client.force_login(self.admin)
+        else:
+            client.get("/api/csrf-token/")
+        paths = ["/api/products/", "/api/tags/"] + (["/api/orders/"] if staff else [])
+        paths += [f"/api/products/{pid}/" for pid in self.product_ids[:5]]
+
+        queries = _SessionQueries()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            for i in range(count):
+                client.get(paths[i % len(paths)])
+        elapsed = time.perf_counter() - start
+        return {
+            "requests": count,
+            "session_queries": dict(queries.counts),
+            "writes": sum(n for kind, n in queries.counts.items() if kind != "SELECT"),
+            "avg_ms": round(elapsed / count * 1000, 2),
+        }
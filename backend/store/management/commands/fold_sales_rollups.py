@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store import sales
+
+
+class Command(BaseCommand):
+    help = "把下單累積的銷售差額併入每日銷售彙總（建議以排程每幾分鐘執行，報表只讀已併入的彙總）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        folded = sales.fold(opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"已併入 {folded} 筆差額"))
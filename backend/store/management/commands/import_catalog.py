@@ -0,0 +1,37 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.catalog_io import CatalogFormatError, CatalogImporter, read_records
+
+
+class Command(BaseCommand):
+    help = "從 CSV 或 JSON Lines 批次匯入（upsert）商品、規格與標籤，以 sku 對應既有商品"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="檔案路徑，- 代表 stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="預設依副檔名判斷")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        importer = CatalogImporter(batch_size=opts["batch_size"])
+
+        start = time.perf_counter()
+        fp = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        try:
+            importer.run(read_records(fp, fmt))
+        except CatalogFormatError as e:
+            raise CommandError(f"{e}（已匯入 {importer.products} 個商品）")
+        finally:
+            if fp is not sys.stdin:
+                fp.close()
+        elapsed = time.perf_counter() - start
+
+        rate = importer.products / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"已匯入 {importer.products} 個商品、{importer.variants} 個規格，"
+            f"耗時 {elapsed:.1f} 秒（{rate:.0f} rows/sec）"
+        ))
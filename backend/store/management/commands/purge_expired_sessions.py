@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from config import sessions
+
+
+class Command(BaseCommand):
+    help = "分批刪除過期的 session（取代一次刪除全部的 clearsessions，建議以排程每小時執行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        deleted = sessions.purge_expired(opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"已刪除 {deleted} 筆過期 session"))
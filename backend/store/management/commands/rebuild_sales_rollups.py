@@ -0,0 +1,23 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import sales
+
+
+class Command(BaseCommand):
+    help = "依訂單重算每日銷售彙總（分批讀取訂單；--since 只重算該日之後）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD，預設重算全部")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        since = None
+        if opts["since"]:
+            try:
+                since = dt.date.fromisoformat(opts["since"])
+            except ValueError as e:
+                raise CommandError(f"日期格式錯誤: {e}")
+        processed = sales.rebuild(since=since, chunk_size=opts["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"已重算 {processed} 筆訂單的銷售彙總"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store import search
+
+
+class Command(BaseCommand):
+    help = "重建商品全文搜尋索引（bulk 匯入商品後執行）"
+
+    def handle(self, *args, **opts):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING("目前的資料庫不支援全文索引，搜尋會使用子字串比對"))
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"已重建 {count} 個商品的搜尋索引"))
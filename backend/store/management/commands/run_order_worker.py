@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from store import order_queue
+
+
+class Command(BaseCommand):
+    help = "處理下單佇列（ORDER_INTAKE_QUEUED=True 時使用）：批次建立訂單，佇列空了就輪詢等待"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="每個交易處理的 ticket 數")
+        parser.add_argument("--interval", type=float, default=0.5, help="佇列空時的輪詢間隔（秒）")
+        parser.add_argument("--once", action="store_true", help="處理到佇列清空就結束")
+
+    def handle(self, *args, **opts):
+        processed = 0
+        try:
+            while True:
+                try:
+                    count = order_queue.drain_once(opts["batch_size"])
+                except DatabaseError as e:
+                    # 這批已放回佇列，稍後重試
+                    if opts["once"]:
+                        raise
+                    self.stderr.write(f"批次處理失敗，稍後重試: {e}")
+                    count = 0
+                processed += count
+                if count:
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(opts["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"已處理 {processed} 張"))
@@ -0,0 +1,118 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from store import catalog, search
+from store.management.commands._benchmark import require_sqlite
+from store.models import Order, OrderItem, Product, ProductVariant, Tag
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "建立壓測用的假資料：N 個商品 × M 個規格 × K 個標籤，以及歷史訂單（僅限 SQLite）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--variants", type=int, default=3, help="每個商品的規格數")
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument("--tags-per-product", type=int, default=3)
+        parser.add_argument("--orders", type=int, default=2000)
+        parser.add_argument("--items-per-order", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        require_sqlite()
+
+        rng = random.Random(opts["seed"])
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S")
+
+        with transaction.atomic():
+            tags = self._seed_tags(opts["tags"])
+            products = self._seed_products(rng, stamp, opts["products"], opts["variants"])
+            self._seed_product_tags(rng, products, tags, opts["tags_per_product"])
+            self._seed_orders(rng, stamp, products, opts["orders"], opts["items_per_order"])
+            # bulk_create 不會觸發 signal，手動重建搜尋索引並讓目錄快照失效
+            search.rebuild()
+            catalog.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已建立 {len(products)} 個商品、{len(tags)} 個標籤、{opts['orders']} 筆訂單"
+        ))
+
+    def _seed_tags(self, count: int) -> list[Tag]:
+        names = [f"bench-tag-{i}" for i in range(count)]
+        Tag.objects.bulk_create([Tag(name=n) for n in names], ignore_conflicts=True)
+        return list(Tag.objects.filter(name__in=names))
+
+    def _seed_products(self, rng: random.Random, stamp: str, count: int, variants: int) -> list[Product]:
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    sku=f"BENCH-{stamp}-{i}",
+                    name=f"壓測商品 {stamp}-{i}",
+                    price=Decimal(rng.randint(50, 2000)),
+                    description=f"壓測用商品描述 {i} " * 5,
+                )
+                for i in range(count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ProductVariant.objects.bulk_create(
+            [
+                ProductVariant(product=p, name=f"規格{v}", price=p.price + v * 10, order=v)
+                for p in products
+                for v in range(variants)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        return products
+
+    def _seed_product_tags(self, rng: random.Random, products: list[Product], tags: list[Tag], per_product: int):
+        if not tags:
+            return
+        through = Product.tags.through
+        rows = [
+            through(product_id=p.id, tag_id=t.id)
+            for p in products
+            for t in rng.sample(tags, min(per_product, len(tags)))
+        ]
+        through.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    def _seed_orders(self, rng: random.Random, stamp: str, products: list[Product], count: int, per_order: int):
+        if not products:
+            return
+        orders = Order.objects.bulk_create(
+            [
+                Order(
+                    order_no=f"BENCH-{stamp}-{i}",
+                    customer_name="壓測顧客",
+                    customer_phone=f"09{rng.randint(0, 99999999):08d}",
+                    pickup_store_address="壓測門市",
+                    total_amount=Decimal("0"),
+                    status=rng.choice(Order.Status.values),
+                )
+                for i in range(count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        items = []
+        for order in orders:
+            total = Decimal("0")
+            for product in rng.sample(products, min(per_order, len(products))):
+                qty = rng.randint(1, 3)
+                items.append(OrderItem(
+                    order=order,
+                    product=product,
+                    product_name_snapshot=product.name,
+                    unit_price_snapshot=product.price,
+                    quantity=qty,
+                    line_total=product.price * qty,
+                ))
+                total += product.price * qty
+            order.total_amount = total
+        OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        Order.objects.bulk_update(orders, ["total_amount"], batch_size=BATCH_SIZE)
@@ -0,0 +1,44 @@
+# Generated manually: full-text search index for products (see store/search.py)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE store_productsearch USING fts5(name, description, tokenize='unicode61')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE store_productsearch ("
+            " product_id bigint PRIMARY KEY REFERENCES store_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX store_productsearch_document_gin ON store_productsearch USING gin (document)"
+        )
+    else:
+        return
+
+    from store import search
+
+    db_alias = schema_editor.connection.alias
+    Product = apps.get_model("store", "Product")
+    search.rebuild(using=db_alias, products=Product.objects.using(db_alias))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS store_productsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
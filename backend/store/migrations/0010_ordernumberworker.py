@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberWorker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hostname', models.CharField(blank=True, default='', max_length=100)),
+                ('pid', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
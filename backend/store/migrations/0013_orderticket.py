@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket', models.CharField(max_length=32, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', '排隊中'), ('PROCESSING', '處理中'), ('DONE', '已成立'), ('FAILED', '失敗')], default='PENDING', max_length=20)),
+                ('payload', models.JSONField()),
+                ('error', models.TextField(blank=True, default='')),
+                ('claim_token', models.CharField(blank=True, default='', max_length=32)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='store.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='store_ticket_status_id')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_active_variant_count(apps, schema_editor):
+    # 只用歷史 model，不引用 store 的程式碼（之後修改不會影響這個 migration）
+    db_alias = schema_editor.connection.alias
+    Product = apps.get_model("store", "Product")
+    ProductVariant = apps.get_model("store", "ProductVariant")
+    counts = (
+        ProductVariant.objects.using(db_alias)
+        .filter(product=models.OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("product")
+        .annotate(n=models.Count("pk"))
+        .values("n")
+    )
+    Product.objects.using(db_alias).update(active_variant_count=Coalesce(models.Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_orderticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='active_variant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='store_product_active_id'),
+        ),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'order', 'id'], name='store_variant_active_order'),
+        ),
+        # 自動產生的 M2M 中介表只有 (product_id, tag_id) 的 unique 索引；依標籤找商品需要反向的複合索引
+        migrations.RunSQL(
+            "CREATE INDEX store_product_tags_tag_product ON store_product_tags (tag_id, product_id)",
+            "DROP INDEX store_product_tags_tag_product",
+        ),
+        migrations.RunPython(backfill_active_variant_count, migrations.RunPython.noop),
+    ]
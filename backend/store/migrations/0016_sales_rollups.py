@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_order_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('NEW', '新訂單'), ('CONFIRMED', '已確認'), ('CANCELLED', '已取消')], max_length=20)),
+                ('product_name', models.CharField(max_length=200)),
+                ('line_count', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'status', 'product_name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('NEW', '新訂單'), ('CONFIRMED', '已確認'), ('CANCELLED', '已取消')], max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'status')},
+            },
+        ),
+    ]
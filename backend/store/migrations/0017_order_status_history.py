@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('NEW', '新訂單'), ('CONFIRMED', '已確認'), ('CANCELLED', '已取消')], max_length=20)),
+                ('to_status', models.CharField(choices=[('NEW', '新訂單'), ('CONFIRMED', '已確認'), ('CANCELLED', '已取消')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='store.order')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+def backfill_reserved_qty(apps, schema_editor):
+    # 既有訂單沒有記錄是否扣過庫存：沿用原本的判斷（SKU 目前有追蹤庫存就視為已扣），未取消的才需要
+    db_alias = schema_editor.connection.alias
+    OrderItem = apps.get_model("store", "OrderItem")
+    items = OrderItem.objects.using(db_alias).filter(order__stock_released=False)
+    items.filter(variant__isnull=False, variant__stock__isnull=False).update(reserved_qty=models.F("quantity"))
+    items.filter(variant__isnull=True, product__stock__isnull=False).update(reserved_qty=models.F("quantity"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_order_status_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='reserved_qty',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reserved_qty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_sales_deltas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalesdelta',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_dailysalesdelta_created_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='active_variant_count',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:20
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Concat
+
+
+def backfill_sku(apps, schema_editor):
+    # 既有商品沒有 sku，匯出後無法再匯入；補上 ID-<id>（與 catalog_io.fill_missing_skus 相同，這裡不引用 store 的程式碼）
+    Product = apps.get_model("store", "Product")
+    Product.objects.using(schema_editor.connection.alias).filter(sku__isnull=True).update(
+        sku=Concat(models.Value("ID-"), Cast("pk", models.CharField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_remove_product_active_variant_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sku, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,31 @@
+from django.conf import settings
 from django.db import models
 
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
 
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)  # 批次匯入的對應鍵
     name = models.CharField(max_length=200)
     price = models.DecimalField(max_digits=10, decimal_places=0)
     is_active = models.BooleanField(default=True)
     tags = models.ManyToManyField(Tag, related_name="products", blank=True)
     image_url = models.URLField(blank=True, default="")
     description = models.TextField(blank=True, default="")
+    stock = models.PositiveIntegerField(null=True, blank=True)  # 沒有規格時的庫存；空白代表不追蹤庫存
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # 上架商品依 id 排序（目錄快照、cursor 分頁）
+            models.Index(fields=["id"], condition=models.Q(is_active=True), name="store_product_active_id"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -28,10 +39,20 @@ class ProductVariant(models.Model):
     image_url = models.URLField(blank=True, default="")  # 這個規格的圖片（可選）
     is_active = models.BooleanField(default=True)  # 是否啟用
     order = models.PositiveIntegerField(default=0)  # 排序
+    stock = models.PositiveIntegerField(null=True, blank=True)  # 庫存；空白代表不追蹤庫存
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["order", "id"]
         unique_together = [["product", "name"]]  # 同一商品不能有重複的規格名稱
+        indexes = [
+            # 啟用中的規格依商品取出並依 (order, id) 排序（計價、規格數統計）
+            models.Index(
+                fields=["product", "order", "id"],
+                condition=models.Q(is_active=True),
+                name="store_variant_active_order",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.product.name} - {self.name}"
@@ -49,25 +70,168 @@ class Order(models.Model):
     pickup_store_address = models.TextField()
     total_amount = models.DecimalField(max_digits=10, decimal_places=0)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.NEW)
+    stock_released = models.BooleanField(default=False)  # 取消後是否已歸還庫存（確保只歸還一次）
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # 訂單列表（API 與後台）依 (created_at, id) 倒序分頁、依日期篩選
+            models.Index(fields=["created_at", "id"], name="store_order_created_id"),
+        ]
+
     def __str__(self) -> str:
         return self.order_no
 
 
+class OrderNumberWorker(models.Model):
+    """每個產生訂單編號的 process 登記一列，id 作為編號中的 worker 欄位（見 order_numbers.py）"""
+
+    hostname = models.CharField(max_length=100, blank=True, default="")
+    pid = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.hostname}:{self.pid}"
+
+
+class OrderTicket(models.Model):
+    """
+    佇列模式的下單請求（見 order_queue.py）：API 驗證後寫入一列並回 202，
+    由 run_order_worker 批次建立訂單，用戶端以 ticket 查詢結果
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "排隊中"
+        PROCESSING = "PROCESSING", "處理中"
+        DONE = "DONE", "已成立"
+        FAILED = "FAILED", "失敗"
+
+    ticket = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    payload = models.JSONField()  # OrderCreateSerializer 驗證後的資料
+    order = models.OneToOneField(Order, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True, default="")
+    claim_token = models.CharField(max_length=32, blank=True, default="")  # 認領這一批的 worker
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"], name="store_ticket_status_id")]
+
+    def __str__(self) -> str:
+        return self.ticket
+
+
+class IdempotencyKey(models.Model):
+    """下單 API 的 Idempotency-Key 紀錄（見 idempotency.py）；response_body 為空代表請求仍在處理中"""
+
+    key = models.CharField(max_length=64, unique=True)  # 用戶端 key 的 SHA-256
+    fingerprint = models.CharField(max_length=64)  # 請求內容的 SHA-256，同一個 key 不能換內容
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.key
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
     product = models.ForeignKey(Product, null=True, blank=True, on_delete=models.SET_NULL)
+    variant = models.ForeignKey(ProductVariant, null=True, blank=True, on_delete=models.SET_NULL)
     product_name_snapshot = models.CharField(max_length=200)
     unit_price_snapshot = models.DecimalField(max_digits=10, decimal_places=0)
     quantity = models.PositiveIntegerField()
     line_total = models.DecimalField(max_digits=10, decimal_places=0)
+    reserved_qty = models.PositiveIntegerField(default=0)  # 下單時實際扣除的庫存；取消時只歸還這個數量
 
     def __str__(self) -> str:
         return f"{self.order.order_no} - {self.product_name_snapshot} x {self.quantity}"
 
 
+class OrderStatusHistory(models.Model):
+    """訂單狀態變更紀錄，只新增不修改（批次變更見 order_status.py，單筆存檔由 signals.py 寫入）"""
+
+    order = models.ForeignKey(Order, related_name="status_history", on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, choices=Order.Status.choices)
+    to_status = models.CharField(max_length=20, choices=Order.Status.choices)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.order_id}: {self.from_status} → {self.to_status}"
+
+
+class DailySalesSummary(models.Model):
+    """每日（台灣時間）、每個訂單狀態的訂單數與營收；由 sales.py 併入 DailySalesDelta 維護，報表 API 只讀彙總表"""
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        unique_together = [("date", "status")]
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.status}"
+
+
+class DailyProductSales(models.Model):
+    """每日、每個訂單狀態、每個品名（下單當時的商品 / 規格名稱）的銷售量與營收"""
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    product_name = models.CharField(max_length=200)
+    line_count = models.IntegerField(default=0)  # 訂單項目數
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        unique_together = [("date", "status", "product_name")]
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.status} {self.product_name}"
+
+
+class DailySalesDelta(models.Model):
+    """
+    DailySalesSummary 尚未併入的差額，只新增不修改：下單、改狀態時寫這裡，不必鎖住當天的彙總列，
+    由 sales.fold（manage.py fold_sales_rollups 排程）定期併入彙總表後刪除
+    """
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)  # 報表以最舊一筆標示尚未併入的變動
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.status} {self.order_count:+d}"
+
+
+class DailyProductSalesDelta(models.Model):
+    """DailyProductSales 尚未併入的差額（同 DailySalesDelta）"""
+
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    product_name = models.CharField(max_length=200)
+    line_count = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    def __str__(self) -> str:
+        return f"{self.date} {self.status} {self.product_name} {self.quantity:+d}"
+
+
 class ShopSettings(models.Model):
     """
     Singleton settings row for the shop.
@@ -0,0 +1,91 @@
+"""
+訂單串流匯出（會計用）：一列 = 一個訂單項目，附帶所屬訂單的欄位。
+
+以 .iterator(chunk_size=...) 逐批讀取（PostgreSQL 上為 server-side cursor），
+每讀到一列就輸出一列，記憶體用量固定，回應也能立即開始傳送。
+"""
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+from typing import Iterator
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import OrderItem
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    ("order_no", "order__order_no"),
+    ("created_at", "order__created_at"),
+    ("status", "order__status"),
+    ("customer_name", "order__customer_name"),
+    ("customer_phone", "order__customer_phone"),
+    ("pickup_store_address", "order__pickup_store_address"),
+    ("total_amount", "order__total_amount"),
+    ("product_id", "product_id"),
+    ("product_name_snapshot", "product_name_snapshot"),
+    ("unit_price_snapshot", "unit_price_snapshot"),
+    ("quantity", "quantity"),
+    ("line_total", "line_total"),
+]
+
+
+def parse_bound(value: str, end: bool = False) -> datetime | None:
+    """
+    接受 YYYY-MM-DD 或 ISO datetime；只給日期時，結束時間包含當天整天。
+    無法解析時丟出 ValueError。
+    """
+    if not value:
+        return None
+    try:
+        d = parse_date(value)
+    except ValueError:
+        d = None
+    if d is not None:
+        dt = datetime.combine(d + timedelta(days=1) if end else d, time.min)
+    else:
+        dt = parse_datetime(value)
+        if dt is None:
+            raise ValueError(value)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def iter_rows(created_from: datetime | None, created_to: datetime | None, status: str | None) -> Iterator[tuple]:
+    qs = OrderItem.objects.all()
+    if created_from:
+        qs = qs.filter(order__created_at__gte=created_from)
+    if created_to:
+        qs = qs.filter(order__created_at__lt=created_to)
+    if status:
+        qs = qs.filter(order__status=status)
+    qs = qs.order_by("order__created_at", "order_id", "id").values_list(*(src for _, src in COLUMNS))
+    for row in qs.iterator(chunk_size=CHUNK_SIZE):
+        created_at = timezone.localtime(row[1]).isoformat()
+        yield tuple(created_at if i == 1 else value for i, value in enumerate(row))
+
+
+class _Echo:
+    """csv.writer 需要檔案物件；直接把寫入的字串傳回，不做緩衝"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows: Iterator[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    # BOM 讓 Excel 正確辨識 UTF-8 中文
+    yield "\ufeff" + writer.writerow([name for name, _ in COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows: Iterator[tuple]) -> Iterator[str]:
+    names = [name for name, _ in COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str) + "\n"
@@ -0,0 +1,72 @@
+"""
+訂單編號產生器：格式 MKT-YYYYMMDD-<worker>-<seq>-<RAND>
+
+- worker：每個 process 在交易外向資料庫登記一次取得的唯一 id（base36，見 ensure_worker）
+- seq：process 內當天的流水號（base36），由 thread lock 保護，跨日歸零（日期只往前走）
+- RAND：4 位隨機數字，讓公開的訂單查詢網址無法被逐號猜出
+
+(worker, 日期, seq) 在所有 process 之間都不會重複，所以不需要衝突重試；
+下單路徑不會再為了編號多打任何資料庫查詢。
+"""
+from __future__ import annotations
+
+import os
+import secrets
+import socket
+import threading
+
+from django.utils import timezone
+
+from .models import OrderNumberWorker
+
+_lock = threading.Lock()
+_state = {"pid": None, "worker": None, "date": None, "seq": 0}
+
+_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _base36(n: int) -> str:
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = _DIGITS[r] + out
+        if n == 0:
+            return out
+
+
+def _register_worker() -> int:
+    return OrderNumberWorker.objects.create(hostname=socket.gethostname()[:100], pid=os.getpid()).id
+
+
+def _worker_locked() -> int:
+    # fork 出來的子 process 會繼承父 process 的狀態，pid 不同就重新登記
+    if _state["pid"] != os.getpid():
+        _state.update(pid=os.getpid(), worker=_register_worker(), date=None, seq=0)
+    return _state["worker"]
+
+
+def ensure_worker() -> int:
+    """
+    登記這個 process 的 worker id。要在交易外呼叫（下單 view 在開交易前、佇列 worker 在每批之前）：
+    在交易內登記的列會隨交易回滾消失，SQLite 之後可能把同一個 id 配給另一個 process。
+    """
+    with _lock:
+        return _worker_locked()
+
+
+def generate() -> str:
+    with _lock:
+        worker = _worker_locked()
+        # 在 lock 內讀日期且只往前走：跨日前後的執行緒不會把流水號來回歸零
+        today = timezone.localdate()
+        if _state["date"] is None or today > _state["date"]:
+            _state.update(date=today, seq=0)
+        _state["seq"] += 1
+        day, seq = _state["date"], _state["seq"]
+    return f"MKT-{day:%Y%m%d}-{_base36(worker)}-{_base36(seq)}-{secrets.randbelow(9000) + 1000}"
+
+
+def reset() -> None:
+    """測試用：下次產生編號時重新登記 worker"""
+    with _lock:
+        _state.update(pid=None, worker=None, date=None, seq=0)
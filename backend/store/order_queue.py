@@ -0,0 +1,184 @@
+"""
+下單佇列（ORDER_INTAKE_QUEUED=True 時啟用，搶購尖峰時削峰）。
+
+API 只做驗證與計價，寫入一列 OrderTicket 就回 202；run_order_worker 批次處理：
+1. 以條件式 UPDATE 認領一批 PENDING ticket（不依賴 SELECT ... SKIP LOCKED，SQLite 也能跑）
+2. 整批重新計價（固定 2 個查詢），每張訂單在 savepoint 內扣庫存，不足的標成 FAILED
+3. 成立的訂單與項目各一次 bulk insert，銷售彙總與 ticket 狀態一起更新，整批一個交易
+
+批次失敗（例如資料庫死結）時整批回滾並放回佇列；worker 中斷留下的 PROCESSING 超過 STALE_AFTER 也會放回。
+其他例外（例如 payload 缺欄位）改成逐張重新處理，出錯的那張標成 FAILED，不會讓整批一直重試。
+"""
+from __future__ import annotations
+
+import secrets
+from datetime import timedelta
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import inventory, order_numbers, pricing, sales
+from .models import Order, OrderItem, OrderTicket
+
+STALE_AFTER = timedelta(minutes=5)
+
+
+def build_items(order: Order, lines) -> list[OrderItem]:
+    return [
+        OrderItem(
+            order=order,
+            product=line.product,
+            variant=line.variant,
+            product_name_snapshot=line.name,
+            unit_price_snapshot=line.unit_price,
+            quantity=line.quantity,
+            line_total=line.line_total,
+            reserved_qty=inventory.reserved_quantity(line),
+        )
+        for line in lines
+    ]
+
+
+def enqueue(data: dict) -> OrderTicket:
+    """data 為 OrderCreateSerializer 驗證後的資料"""
+    payload = {
+        "customer_name": data["customer_name"],
+        "customer_phone": data["customer_phone"],
+        "pickup_store_address": data["pickup_store_address"],
+        "items": [
+            {"product_id": it["product_id"], "variant_id": it.get("variant_id"), "quantity": it["quantity"]}
+            for it in data["items"]
+        ],
+    }
+    return OrderTicket.objects.create(ticket=secrets.token_urlsafe(16), payload=payload)
+
+
+def requeue_stale() -> int:
+    return OrderTicket.objects.filter(
+        status=OrderTicket.Status.PROCESSING, claimed_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=OrderTicket.Status.PENDING, claim_token="", claimed_at=None)
+
+
+def _claim(batch_size: int) -> str | None:
+    ids = list(
+        OrderTicket.objects.filter(status=OrderTicket.Status.PENDING)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return None
+    token = secrets.token_hex(16)
+    # 條件式 UPDATE：其他 worker 先認領走的 ticket 狀態已不是 PENDING，不會被重複認領
+    claimed = OrderTicket.objects.filter(id__in=ids, status=OrderTicket.Status.PENDING).update(
+        status=OrderTicket.Status.PROCESSING, claim_token=token, claimed_at=timezone.now()
+    )
+    return token if claimed else None
+
+
+def _release(token: str) -> None:
+    OrderTicket.objects.filter(claim_token=token, status=OrderTicket.Status.PROCESSING).update(
+        status=OrderTicket.Status.PENDING, claim_token="", claimed_at=None
+    )
+
+
+def _fail(ticket: OrderTicket, error: str) -> None:
+    ticket.status = OrderTicket.Status.FAILED
+    ticket.error = error
+
+
+@transaction.atomic
+def _process(token: str) -> int:
+    # 鎖住並重新確認仍由自己認領（處理太久被放回佇列、又被別人認領走的就跳過）
+    tickets = list(
+        OrderTicket.objects.select_for_update()
+        .filter(claim_token=token, status=OrderTicket.Status.PROCESSING)
+        .order_by("id")
+    )
+    priced_orders = pricing.price_orders([t.payload["items"] for t in tickets])
+
+    accepted = []
+    for ticket, priced in zip(tickets, priced_orders):
+        if priced.missing_product_ids:
+            _fail(ticket, f"找不到商品或已下架: {list(priced.missing_product_ids)}")
+            continue
+        if priced.missing_variant_ids:
+            _fail(ticket, f"找不到規格或已停用: {list(priced.missing_variant_ids)}")
+            continue
+        try:
+            with transaction.atomic():
+                inventory.reserve(priced.lines)
+        except inventory.OutOfStock as e:
+            _fail(ticket, f"庫存不足: {e.name}")
+            continue
+        payload = ticket.payload
+        order = Order(
+            order_no=order_numbers.generate(),
+            customer_name=payload["customer_name"],
+            customer_phone=payload["customer_phone"],
+            pickup_store_address=payload["pickup_store_address"],
+            total_amount=priced.total,
+            status=Order.Status.NEW,
+        )
+        accepted.append((ticket, order, priced))
+
+    Order.objects.bulk_create([order for _, order, _ in accepted])
+    entries = [(order, build_items(order, priced.lines)) for _, order, priced in accepted]
+    OrderItem.objects.bulk_create([item for _, items in entries for item in items])
+    sales.record_created(entries)
+
+    now = timezone.now()
+    for ticket, order, _ in accepted:
+        ticket.status = OrderTicket.Status.DONE
+        ticket.order = order
+    for ticket in tickets:
+        ticket.processed_at = now
+    OrderTicket.objects.bulk_update(tickets, ["status", "order", "error", "processed_at"])
+    return len(tickets)
+
+
+def _process_each(token: str) -> int:
+    """整批處理出錯時逐張重新處理：出錯的 ticket 標成 FAILED，其他照常建立訂單"""
+    ids = list(
+        OrderTicket.objects.filter(claim_token=token, status=OrderTicket.Status.PROCESSING)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for ticket_id in ids:
+        single = secrets.token_hex(16)
+        OrderTicket.objects.filter(id=ticket_id, claim_token=token, status=OrderTicket.Status.PROCESSING).update(
+            claim_token=single
+        )
+        try:
+            _process(single)
+        except DatabaseError:
+            _release(single)
+            raise
+        except Exception as e:
+            OrderTicket.objects.filter(claim_token=single, status=OrderTicket.Status.PROCESSING).update(
+                status=OrderTicket.Status.FAILED,
+                error=f"訂單資料無法處理: {type(e).__name__}: {e}",
+                processed_at=timezone.now(),
+            )
+    return len(ids)
+
+
+def drain_once(batch_size: int = 100) -> int:
+    """處理一批，回傳處理的 ticket 數（0 代表佇列是空的）"""
+    requeue_stale()
+    token = _claim(batch_size)
+    if token is None:
+        return 0
+    order_numbers.ensure_worker()  # _process 在交易內產生編號，worker 要先在交易外登記
+    try:
+        return _process(token)
+    except DatabaseError:
+        # 資料庫暫時性錯誤：整批放回佇列，稍後重試
+        _release(token)
+        raise
+    except Exception:
+        pass
+    try:
+        return _process_each(token)
+    except DatabaseError:
+        _release(token)  # 還沒輪到的 ticket 放回佇列
+        raise
@@ -0,0 +1,90 @@
+"""
+批次變更訂單狀態（管理員 API 與後台動作），每批固定幾個查詢，與訂單數無關：
+1. SELECT ... FOR UPDATE 鎖住並讀取這批訂單目前的狀態
+2. 依原狀態分組 UPDATE ... WHERE status = <原狀態> AND id IN (...)，在 SQL 層確認轉換合法
+3. 狀態紀錄一次 bulk_create；銷售彙總一起搬移，取消的訂單依 SKU 加總歸還庫存
+
+queryset.update 不會送出 post_save，單筆存檔時由 signals.py 處理的事（狀態紀錄、銷售彙總、歸還庫存）都在這裡批次完成。
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import inventory, sales
+from .models import Order, OrderStatusHistory
+
+# 目標狀態 → 允許的原狀態
+ALLOWED = {
+    Order.Status.CONFIRMED: (Order.Status.NEW,),
+    Order.Status.CANCELLED: (Order.Status.NEW, Order.Status.CONFIRMED),
+}
+BATCH_SIZE = 500
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"  # 原本就是目標狀態
+INVALID = "invalid_transition"
+
+
+@dataclass(frozen=True)
+class Outcome:
+    order_no: str
+    result: str
+    from_status: str
+
+
+def transition(orders, to_status: str, user=None) -> list[Outcome]:
+    """把 orders（Order queryset）改為 to_status，依 id 每 BATCH_SIZE 筆一個交易，回傳每張訂單的結果"""
+    if to_status not in ALLOWED:
+        raise ValueError(f"不支援的目標狀態: {to_status}")
+    ids = list(orders.order_by("id").values_list("id", flat=True))
+    outcomes = []
+    for start in range(0, len(ids), BATCH_SIZE):
+        outcomes.extend(_transition_batch(ids[start:start + BATCH_SIZE], to_status, user))
+    return outcomes
+
+
+@transaction.atomic
+def _transition_batch(ids: list[int], to_status: str, user) -> list[Outcome]:
+    orders = list(
+        Order.objects.select_for_update()
+        .filter(id__in=ids)
+        .order_by("id")
+        .only("id", "order_no", "status", "total_amount", "created_at")
+    )
+    previous = {order.id: order.status for order in orders}
+    by_status = defaultdict(list)
+    for order in orders:
+        if order.status in ALLOWED[to_status]:
+            by_status[order.status].append(order.id)
+
+    now = timezone.now()
+    for from_status, group in by_status.items():
+        # 這批訂單已鎖住，WHERE status 再確認一次原狀態
+        Order.objects.filter(id__in=group, status=from_status).update(status=to_status, updated_at=now)
+
+    changed = [order for order in orders if order.status in ALLOWED[to_status]]
+    if changed:
+        OrderStatusHistory.objects.bulk_create(
+            OrderStatusHistory(order=order, from_status=order.status, to_status=to_status, changed_by=user)
+            for order in changed
+        )
+        for order in changed:
+            order.status = to_status
+        sales.record_status_changes([(order, previous[order.id]) for order in changed])
+        if to_status == Order.Status.CANCELLED:
+            inventory.release_orders([order.id for order in changed])
+
+    outcomes = []
+    for order in orders:
+        if previous[order.id] == to_status:
+            result = UNCHANGED
+        elif order.status == to_status:
+            result = CHANGED
+        else:
+            result = INVALID
+        outcomes.append(Outcome(order.order_no, result, previous[order.id]))
+    return outcomes
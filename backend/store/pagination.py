@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class StoreCursorPagination(CursorPagination):
+    """
+    Keyset（cursor）分頁：以排序欄位的位置定位下一頁，新資料插入時不會跳頁或重複。
+    帶 paginate=false 時回傳舊的完整陣列格式（相容既有前端）。
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        if request.query_params.get("paginate", "").lower() == "false":
+            return None
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if isinstance(queryset, list):
+            queryset = _ListQuery(queryset)
+        try:
+            return super().paginate_queryset(queryset, request, view)
+        except (ValueError, ValidationError):
+            # cursor 內的位置被竄改成無法比較的值
+            raise NotFound(self.invalid_cursor_message)
+
+
+class ProductCursorPagination(StoreCursorPagination):
+    ordering = ("id",)
+
+
+class OrderCursorPagination(StoreCursorPagination):
+    ordering = ("-created_at", "-id")
+
+
+class _ListQuery:
+    """讓已排序的 dict 列表（例如目錄快照）套用 CursorPagination 所需的 queryset 操作"""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+
+    def order_by(self, *ordering):
+        field = ordering[0]
+        key = field.lstrip("-")
+        items = sorted(self.items, key=lambda it: it[key], reverse=field.startswith("-"))
+        return _ListQuery(items)
+
+    def filter(self, **kwargs):
+        ((lookup, position),) = kwargs.items()
+        field, op = lookup.rsplit("__", 1)
+        position = type(self.items[0][field])(position) if self.items else position
+        if op == "gt":
+            items = [it for it in self.items if it[field] > position]
+        else:
+            items = [it for it in self.items if it[field] < position]
+        return _ListQuery(items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    後台 changelist 用：沒有篩選條件時以資料庫的統計資訊估計總筆數，不對整張大表做 COUNT(*)。
+    目前只有 PostgreSQL 有可用的估計值（pg_class.reltuples，由 autovacuum / ANALYZE 更新）；
+    其他資料庫、有篩選 / 搜尋條件，或估計值小於 EXACT_BELOW 時仍精確計數。
+    """
+
+    EXACT_BELOW = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.EXACT_BELOW:
+                return estimate
+        return super().count
+
+
+def estimated_row_count(model, using: str = "default") -> int | None:
+    """資料表的估計列數；無法估計（非 PostgreSQL、尚未 ANALYZE）時回傳 None"""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    # PostgreSQL 14 起，從未 ANALYZE 的資料表為 -1
+    return row[0] if row and row[0] >= 0 else None
@@ -0,0 +1,101 @@
+"""
+訂單計價：一次查出整張訂單用到的商品與規格，之後全部在記憶體中計算。
+
+不論訂單有幾個品項，最多 2 個查詢（商品 + 啟用中的規格，沒有指定規格的品項不查規格）；price_orders 一批訂單也一樣。
+指定的規格不存在、已停用或不屬於該商品時列在 missing_variant_ids，不會退回商品本身的價格。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Product, ProductVariant
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    product: Product
+    variant: ProductVariant | None
+    name: str
+    unit_price: Decimal
+    quantity: int
+
+    @property
+    def line_total(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+
+@dataclass(frozen=True)
+class PricedOrder:
+    lines: tuple[PricedLine, ...]
+    missing_product_ids: tuple[int, ...]
+    missing_variant_ids: tuple[int, ...] = ()
+
+    @property
+    def total(self) -> Decimal:
+        return sum((line.line_total for line in self.lines), Decimal("0"))
+
+
+def _load_products(items: list[dict]) -> dict[int, Product]:
+    products = list(Product.objects.filter(id__in={it["product_id"] for it in items}, is_active=True))
+    # 只替購物車中指定了規格的商品載入規格
+    wants_variants = {it["product_id"] for it in items if it.get("variant_id") is not None}
+    with_variants = [p for p in products if p.id in wants_variants]
+    for p in products:
+        if p.id not in wants_variants:
+            p.active_variants = []
+    active_variants = Prefetch(
+        "variants",
+        queryset=ProductVariant.objects.filter(is_active=True),
+        to_attr="active_variants",
+    )
+    prefetch_related_objects(with_variants, active_variants)
+    return {p.id: p for p in products}
+
+
+def _price_line(product: Product, variant: ProductVariant | None, quantity: int) -> PricedLine:
+    """有規格時用規格價格與組合名稱，否則用商品本身"""
+    if variant is None:
+        return PricedLine(product=product, variant=None, name=product.name, unit_price=product.price, quantity=quantity)
+    return PricedLine(
+        product=product,
+        variant=variant,
+        name=f"{product.name} - {variant.name}",
+        unit_price=variant.price,
+        quantity=quantity,
+    )
+
+
+def _price_items(items: list[dict], products_by_id: dict[int, Product]) -> PricedOrder:
+    missing = tuple(sorted({it["product_id"] for it in items} - products_by_id.keys()))
+    if missing:
+        return PricedOrder(lines=(), missing_product_ids=missing)
+    lines, missing_variants = [], set()
+    for it in items:
+        product = products_by_id[it["product_id"]]
+        variant_id, variant = it.get("variant_id"), None
+        if variant_id is not None:  # 明確判斷 None，避免 0 被誤判
+            variant = next((v for v in product.active_variants if v.id == variant_id), None)
+            if variant is None:
+                missing_variants.add(variant_id)
+                continue
+        lines.append(_price_line(product, variant, int(it["quantity"])))
+    if missing_variants:
+        return PricedOrder(lines=(), missing_product_ids=(), missing_variant_ids=tuple(sorted(missing_variants)))
+    return PricedOrder(lines=tuple(lines), missing_product_ids=())
+
+
+def price_order(items: list[dict]) -> PricedOrder:
+    """
+    items 為 OrderItemCreateSerializer 驗證後的資料；找不到或已下架的商品列在 missing_product_ids，
+    找不到或已停用的規格列在 missing_variant_ids
+    """
+    return _price_items(items, _load_products(items))
+
+
+def price_orders(carts: list[list[dict]]) -> list[PricedOrder]:
+    """一次計價多張訂單（下單佇列的 worker 用），查詢數與訂單張數無關"""
+    products_by_id = _load_products([it for items in carts for it in items])
+    return [_price_items(items, products_by_id) for items in carts]
@@ -0,0 +1,261 @@
+"""
+每日銷售彙總（DailySalesSummary / DailyProductSales），報表 API 只讀這兩張表。
+
+- 訂單成立、改狀態、刪除時，在同一個交易內只新增差額列（DailySalesDelta / DailyProductSalesDelta）：
+  不鎖任何既有的列，同時結帳的請求不會排隊等同一列「今天、新訂單」的彙總
+- fold 把差額併入彙總表後刪除（manage.py fold_sales_rollups 排程執行），只有 fold 會鎖彙總列；
+  報表 API 不併入，回傳最舊一筆未併入差額的時間（pending_since）
+- 日期依 TIME_ZONE（台灣時間）切日
+- 彙總與訂單不一致時（例如直接改資料庫）以 manage.py rebuild_sales_rollups 重算
+"""
+from __future__ import annotations
+
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    DailyProductSales,
+    DailyProductSalesDelta,
+    DailySalesDelta,
+    DailySalesSummary,
+    Order,
+    OrderItem,
+)
+
+DAY_KEYS, DAY_VALUES = ("date", "status"), ("order_count", "revenue")
+PRODUCT_KEYS, PRODUCT_VALUES = ("date", "status", "product_name"), ("line_count", "quantity", "revenue")
+
+
+class _Totals:
+    """(日期, 狀態) → [訂單數, 營收]；(日期, 狀態, 品名) → [項目數, 數量, 營收]"""
+
+    def __init__(self):
+        self.days = defaultdict(lambda: [0, Decimal(0)])
+        self.products = defaultdict(lambda: [0, 0, Decimal(0)])
+
+    def add_order(self, order: Order, items, status: str, sign: int = 1) -> None:
+        day = timezone.localdate(order.created_at)
+        totals = self.days[(day, status)]
+        totals[0] += sign
+        totals[1] += sign * order.total_amount
+        for item in items:
+            totals = self.products[(day, status, item.product_name_snapshot)]
+            totals[0] += sign
+            totals[1] += sign * item.quantity
+            totals[2] += sign * item.line_total
+
+    def save(self) -> None:
+        """寫入差額列（每張表一個 INSERT），由 fold 併入彙總表"""
+        with transaction.atomic():
+            DailySalesDelta.objects.bulk_create(
+                DailySalesDelta(**dict(zip(DAY_KEYS + DAY_VALUES, key + tuple(values))))
+                for key, values in self.days.items()
+                if any(values)
+            )
+            DailyProductSalesDelta.objects.bulk_create(
+                DailyProductSalesDelta(**dict(zip(PRODUCT_KEYS + PRODUCT_VALUES, key + tuple(values))))
+                for key, values in self.products.items()
+                if any(values)
+            )
+
+
+def _increment(model, key_fields: tuple[str, ...], value_fields: tuple[str, ...], totals: dict) -> None:
+    """
+    把 totals（key → 各欄位差額）累加到彙總表（fold 使用），固定 3 個查詢（不隨 key 數增加）：
+    1. 缺少的列先以 0 補上（INSERT ... ON CONFLICT DO NOTHING，並行建立同一列也不會出錯）
+    2. 依 key 排序鎖住這些列（固定加鎖順序，交易之間不會互相死結）
+    3. 一個 UPDATE 累加（F() 運算，以資料庫當下的值為準）
+    """
+    totals = {key: values for key, values in totals.items() if any(values)}
+    if not totals:
+        return
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in totals], ignore_conflicts=True)
+    matches = Q()
+    for key in totals:
+        matches |= Q(**dict(zip(key_fields, key)))
+    rows = model.objects.select_for_update().filter(matches).order_by(*key_fields).only(*key_fields)
+
+    to_update = []
+    for row in rows:
+        values = totals[tuple(getattr(row, field) for field in key_fields)]
+        for field, value in zip(value_fields, values):
+            setattr(row, field, F(field) + value)
+        to_update.append(row)
+    model.objects.bulk_update(to_update, value_fields)
+
+
+def _fold_model(delta_model, model, key_fields, value_fields, batch_size: int) -> int:
+    folded = 0
+    while True:
+        with transaction.atomic():
+            # 鎖住這一批差額列：同時執行的 fold 不會重複併入
+            ids = list(delta_model.objects.select_for_update().order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return folded
+            rows = (
+                delta_model.objects.filter(id__in=ids)
+                .values(*key_fields)
+                .annotate(**{f"sum_{field}": Sum(field) for field in value_fields})
+                .order_by()
+            )
+            totals = {
+                tuple(row[field] for field in key_fields): [row[f"sum_{field}"] for field in value_fields]
+                for row in rows
+            }
+            _increment(model, key_fields, value_fields, totals)
+            delta_model.objects.filter(id__in=ids).delete()
+        folded += len(ids)
+
+
+def fold(batch_size: int = 1000) -> int:
+    """把差額列併入彙總表並刪除，回傳併入的差額列數；每批一個交易"""
+    return (
+        _fold_model(DailySalesDelta, DailySalesSummary, DAY_KEYS, DAY_VALUES, batch_size)
+        + _fold_model(DailyProductSalesDelta, DailyProductSales, PRODUCT_KEYS, PRODUCT_VALUES, batch_size)
+    )
+
+
+def record_created(entries) -> None:
+    """entries 為 [(order, items)]；在建立訂單的交易內呼叫"""
+    totals = _Totals()
+    for order, items in entries:
+        totals.add_order(order, items, order.status)
+    totals.save()
+
+
+def record_status_change(order: Order, old_status: str) -> None:
+    """把訂單的金額與項目從舊狀態移到新狀態"""
+    record_status_changes([(order, old_status)])
+
+
+def record_status_changes(changes) -> None:
+    """changes 為 [(order, 原狀態)]，order.status 已是新狀態；所有訂單的項目一次查詢取出"""
+    items = defaultdict(list)
+    item_rows = OrderItem.objects.filter(order__in=[order.pk for order, _ in changes]).only(
+        "order_id", "product_name_snapshot", "quantity", "line_total"
+    )
+    for item in item_rows:
+        items[item.order_id].append(item)
+    totals = _Totals()
+    for order, old_status in changes:
+        totals.add_order(order, items[order.pk], old_status, sign=-1)
+        totals.add_order(order, items[order.pk], order.status)
+    totals.save()
+
+
+def record_deleted(order: Order) -> None:
+    items = list(OrderItem.objects.filter(order=order).only("product_name_snapshot", "quantity", "line_total"))
+    totals = _Totals()
+    totals.add_order(order, items, order.status, sign=-1)
+    totals.save()
+
+
+def rebuild(since: dt.date | None = None, chunk_size: int = 1000) -> int:
+    """
+    重算 since（含）之後的彙總（None 為全部），回傳處理的訂單數。
+    依 id 分批在資料庫端 GROUP BY（每批 2 個查詢），最後在一個交易內替換彙總表。
+    """
+    orders = Order.objects.all()
+    if since is not None:
+        start = timezone.make_aware(dt.datetime.combine(since, dt.time.min))
+        orders = orders.filter(created_at__gte=start)
+
+    # 開始前已存在的差額對應的訂單都會被掃到，最後一併刪除；之後新增的差額與訂單留給 fold。
+    # 先讀差額再讀訂單：差額已提交的訂單一定也已提交，不會漏掃
+    last_delta_ids = (
+        DailySalesDelta.objects.aggregate(m=Max("id"))["m"] or 0,
+        DailyProductSalesDelta.objects.aggregate(m=Max("id"))["m"] or 0,
+    )
+    max_order_id = Order.objects.aggregate(m=Max("id"))["m"] or 0
+    orders = orders.filter(id__lte=max_order_id)
+    totals = _Totals()
+    processed = 0
+    last_id = 0
+    while True:
+        ids = list(orders.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            break
+        chunk = orders.filter(id__gt=last_id, id__lte=ids[-1])
+        last_id = ids[-1]
+        processed += len(ids)
+
+        day_rows = (
+            chunk.annotate(day=TruncDate("created_at"))
+            .values("day", "status")
+            .annotate(orders=Count("id"), revenue=Sum("total_amount"))
+        )
+        for row in day_rows:
+            day_totals = totals.days[(row["day"], row["status"])]
+            day_totals[0] += row["orders"]
+            day_totals[1] += row["revenue"]
+
+        item_rows = (
+            OrderItem.objects.filter(order__in=chunk)
+            .annotate(day=TruncDate("order__created_at"))
+            .values("day", "order__status", "product_name_snapshot")
+            .annotate(lines=Count("id"), quantity=Sum("quantity"), revenue=Sum("line_total"))
+        )
+        for row in item_rows:
+            product_totals = totals.products[(row["day"], row["order__status"], row["product_name_snapshot"])]
+            product_totals[0] += row["lines"]
+            product_totals[1] += row["quantity"]
+            product_totals[2] += row["revenue"]
+
+    with transaction.atomic():
+        stale = [
+            DailySalesSummary.objects.all(),
+            DailyProductSales.objects.all(),
+            DailySalesDelta.objects.filter(id__lte=last_delta_ids[0]),
+            DailyProductSalesDelta.objects.filter(id__lte=last_delta_ids[1]),
+        ]
+        for qs in stale:
+            (qs if since is None else qs.filter(date__gte=since)).delete()
+        DailySalesSummary.objects.bulk_create(
+            DailySalesSummary(date=day, status=status, order_count=count, revenue=revenue)
+            for (day, status), (count, revenue) in totals.days.items()
+        )
+        DailyProductSales.objects.bulk_create(
+            DailyProductSales(date=day, status=status, product_name=name, line_count=lines, quantity=quantity,
+                              revenue=revenue)
+            for (day, status, name), (lines, quantity, revenue) in totals.products.items()
+        )
+    return processed
+
+
+def report(start: dt.date, end: dt.date, statuses: list[str], top: int = 10) -> dict:
+    """
+    start ~ end（含）的每日營收與熱銷品名，只讀彙總表（固定 4 個查詢）。
+    尚未 fold 的差額不計入：pending_since 為最舊一筆未併入差額的建立時間，全部併入時為 None
+    """
+    summaries = DailySalesSummary.objects.filter(date__range=(start, end), status__in=statuses)
+    days = [
+        {"date": row["date"].isoformat(), "order_count": row["orders"], "revenue": str(row["revenue"])}
+        for row in summaries.values("date").annotate(orders=Sum("order_count"), revenue=Sum("revenue")).order_by("date")
+    ]
+    totals = summaries.aggregate(orders=Sum("order_count"), revenue=Sum("revenue"))
+    top_products = (
+        DailyProductSales.objects.filter(date__range=(start, end), status__in=statuses)
+        .values("product_name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .order_by("-revenue", "product_name")[:top]
+    )
+    pending_since = DailySalesDelta.objects.order_by("id").values_list("created_at", flat=True).first()
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "statuses": statuses,
+        "totals": {"order_count": totals["orders"] or 0, "revenue": str(totals["revenue"] or 0)},
+        "days": [d for d in days if d["order_count"]],
+        "top_products": [
+            {"product_name": row["product_name"], "quantity": row["quantity"], "revenue": str(row["revenue"])}
+            for row in top_products
+            if row["quantity"]
+        ],
+        "pending_since": pending_since.isoformat() if pending_since else None,
+    }
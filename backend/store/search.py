@@ -0,0 +1,138 @@
+"""
+商品全文搜尋索引（取代 name/description 的 icontains 全表掃描）。
+
+中文沒有空白分詞，所以在 Python 端先切好 token 再交給資料庫：
+- 中日韓文字：每個字（unigram）加上相鄰兩字（bigram），查詢時用 bigram（單字查詢用 unigram）
+- 英數字：轉小寫後以字為單位，查詢時做前綴比對
+
+後端依資料庫決定：
+- SQLite：FTS5 虛擬表 store_productsearch（rowid = product id），bm25 排序
+- PostgreSQL：store_productsearch 表的 tsvector 欄位 + GIN 索引，ts_rank 排序
+- 其他資料庫：不支援，呼叫端改用記憶體內的子字串比對
+
+索引由 signals.py 在商品存檔 / 刪除時同步；bulk 寫入後請執行 rebuild_search_index。
+"""
+from __future__ import annotations
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import Product
+
+TABLE = "store_productsearch"
+
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"(?P<cjk>[{_CJK}]+)|(?P<word>[^\W_{_CJK}]+)")
+
+
+def _runs(text: str):
+    for m in _TOKEN_RE.finditer(text.casefold()):
+        yield ("cjk", m.group("cjk")) if m.group("cjk") else ("word", m.group("word"))
+
+
+def index_tokens(text: str) -> list[str]:
+    tokens = []
+    for kind, run in _runs(text):
+        if kind == "word":
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_terms(text: str) -> list[tuple[str, bool]]:
+    """回傳 [(token, is_prefix)]，所有 token 都必須命中"""
+    terms = []
+    for kind, run in _runs(text):
+        if kind == "word":
+            terms.append((run, True))
+        elif len(run) == 1:
+            terms.append((run, False))
+        else:
+            terms.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+    return terms
+
+
+def is_supported(using: str = DEFAULT_DB_ALIAS) -> bool:
+    return connections[using].vendor in ("sqlite", "postgresql")
+
+
+# ========== 索引維護 ==========
+
+
+def index_product(product: Product, using: str = DEFAULT_DB_ALIAS) -> None:
+    if not is_supported(using):
+        return
+    name = " ".join(index_tokens(product.name))
+    description = " ".join(index_tokens(product.description))
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+                [product.pk, name, description],
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABLE} (product_id, document) VALUES "
+                "(%s, setweight(array_to_tsvector(%s::text[]), 'A') || setweight(array_to_tsvector(%s::text[]), 'B')) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [product.pk, name.split(), description.split()],
+            )
+
+
+def remove_product(product_id: int, using: str = DEFAULT_DB_ALIAS) -> None:
+    if not is_supported(using):
+        return
+    conn = connections[using]
+    column = "rowid" if conn.vendor == "sqlite" else "product_id"
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [product_id])
+
+
+def rebuild(using: str = DEFAULT_DB_ALIAS, products=None) -> int:
+    """清空後重建整個索引；products 可傳入 migration 的歷史 model queryset"""
+    if not is_supported(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    if products is None:
+        products = Product.objects.using(using)
+    count = 0
+    for product in products.only("id", "name", "description").iterator(chunk_size=500):
+        index_product(product, using)
+        count += 1
+    return count
+
+
+# ========== 查詢 ==========
+
+
+def search_product_ids(text: str) -> list[int] | None:
+    """
+    依相關度排序的商品 id（名稱權重高於描述）。
+    回傳 None 代表無法使用索引（資料庫不支援或查詢切不出 token），呼叫端應改用子字串比對。
+    """
+    terms = query_terms(text)
+    if not terms or not is_supported():
+        return None
+
+    conn = connections[DEFAULT_DB_ALIAS]
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            match = " AND ".join(f'"{token}"' + ("*" if prefix else "") for token, prefix in terms)
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY bm25({TABLE}, 10.0, 1.0), rowid",
+                [match],
+            )
+        else:
+            query = " & ".join(f"'{token}'" + (":*" if prefix else "") for token, prefix in terms)
+            cursor.execute(
+                f"SELECT product_id FROM {TABLE}, CAST(%s AS tsquery) AS q "
+                "WHERE document @@ q ORDER BY ts_rank(document, q) DESC, product_id",
+                [query],
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
 import re
-from decimal import Decimal
 
 from rest_framework import serializers
 
 from .models import Order, OrderItem, Product, ProductVariant, Tag
 
 
+class SparseFieldsMixin:
+    """傳入 fields=[...] 時只保留指定欄位，未選取的巢狀序列化器完全不會執行"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -57,6 +67,11 @@ class OrderCreateSerializer(serializers.Serializer):
         return cleaned
 
 
+class OrderStatusTransitionSerializer(serializers.Serializer):
+    order_nos = serializers.ListField(child=serializers.CharField(max_length=32), allow_empty=False, max_length=1000)
+    status = serializers.ChoiceField(choices=[Order.Status.CONFIRMED, Order.Status.CANCELLED])
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -70,7 +85,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -87,37 +102,3 @@ class OrderSerializer(serializers.ModelSerializer):
             "updated_at",
             "items",
         ]
-
-
-
-
-def _get_variant(product: Product, variant_id: int | None) -> ProductVariant | None:
-    """統一的 variant 查找邏輯：消除重複查詢"""
-    if variant_id is None:  # 明確判斷 None，避免 0 被誤判
-        return None
-    return product.variants.filter(id=variant_id, is_active=True).first()
-
-
-def get_product_price(product: Product, variant_id: int | None) -> Decimal:
-    """統一的價格計算邏輯：如果有 variant_id 且存在，使用 variant 價格，否則使用 product 價格"""
-    variant = _get_variant(product, variant_id)
-    return variant.price if variant else product.price
-
-
-def get_product_name(product: Product, variant_id: int | None) -> str:
-    """統一的商品名稱邏輯：如果有 variant_id 且存在，組合名稱，否則使用 product 名稱"""
-    variant = _get_variant(product, variant_id)
-    return f"{product.name} - {variant.name}" if variant else product.name
-
-
-def calculate_total(items: list[dict], products_by_id: dict[int, Product]) -> Decimal:
-    """計算訂單總金額"""
-    total = Decimal("0")
-    for it in items:
-        product = products_by_id[it["product_id"]]
-        qty = int(it["quantity"])
-        price = get_product_price(product, it.get("variant_id"))
-        total += price * qty
-    return total
-
-
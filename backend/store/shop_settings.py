@@ -0,0 +1,44 @@
+"""
+ShopSettings 快取：設定幾乎不變，但每張訂單都要讀。
+
+- 後台存檔時遞增 cache 裡的版本號（見 signals.py），所有 worker 下一個請求就讀到新值
+- 每個 process 保留目前版本的設定物件，版本沒變就不查資料庫也不反序列化
+- 設定列在 migrate 時建立（ensure_shop_settings），請求路徑只讀不寫
+"""
+from __future__ import annotations
+
+from . import cache_versions
+from .models import ShopSettings
+
+SINGLETON_KEY = "default"
+VERSION_KEY = "store:shop_settings:version"
+DATA_KEY = "store:shop_settings:{version}"
+
+
+def ensure_shop_settings(using: str = "default", **kwargs) -> None:
+    """post_migrate：確保設定列存在"""
+    ShopSettings.objects.using(using).get_or_create(singleton_key=SINGLETON_KEY)
+
+
+def _load() -> ShopSettings:
+    settings = ShopSettings.objects.filter(singleton_key=SINGLETON_KEY).first()
+    if settings is None:
+        # 設定列被手動刪除時才會走到這裡
+        settings, _ = ShopSettings.objects.get_or_create(singleton_key=SINGLETON_KEY)
+    return settings
+
+
+_settings = cache_versions.VersionedValue(VERSION_KEY, DATA_KEY, _load)
+
+
+def get_settings() -> ShopSettings:
+    """取得商店設定（唯讀，呼叫端不可修改後存檔）"""
+    return _settings.get()
+
+
+async def aget_settings() -> ShopSettings:
+    return await _settings.aget()
+
+
+def invalidate() -> None:
+    _settings.invalidate()
@@ -0,0 +1,94 @@
+import time
+
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from config import sessions
+
+from . import catalog, catalog_io, inventory, sales, search, shop_settings
+from .models import Order, OrderStatusHistory, Product, ProductVariant, ShopSettings, Tag
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_catalog(sender, **kwargs):
+    """商品、規格、標籤有任何變動，目錄快照就換新版本"""
+    catalog.invalidate()
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def invalidate_catalog_on_tags_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        catalog.invalidate()
+
+
+@receiver(post_save, sender=ShopSettings)
+@receiver(post_delete, sender=ShopSettings)
+def invalidate_shop_settings(sender, **kwargs):
+    shop_settings.invalidate()
+
+
+@receiver(post_save, sender=Product)
+def fill_missing_sku(sender, instance, using, **kwargs):
+    """後台、API 新增的商品沒有 sku 時補上預設值，匯出後才能再匯入對應回來"""
+    if not instance.sku:
+        catalog_io.fill_missing_skus(Product.objects.using(using).filter(pk=instance.pk))
+        instance.sku = f"{catalog_io.DEFAULT_SKU_PREFIX}{instance.pk}"
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, using, **kwargs):
+    search.index_product(instance, using)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, using, **kwargs):
+    search.remove_product(instance.pk, using)
+
+
+@receiver(post_save, sender=Order)
+def release_stock_on_cancel(sender, instance, created, **kwargs):
+    if not created and instance.status == Order.Status.CANCELLED and not instance.stock_released:
+        inventory.release(instance)
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_status(sender, instance, using, **kwargs):
+    # 新訂單的銷售彙總由建立訂單的地方一起寫入（那時項目還沒建立）
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._previous_status = (
+        Order.objects.using(using).filter(pk=instance.pk).values_list("status", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def track_status_change(sender, instance, created, **kwargs):
+    """單筆存檔改狀態時寫入狀態紀錄並搬移銷售彙總（批次變更見 order_status.py）"""
+    previous = getattr(instance, "_previous_status", None)
+    if not created and previous is not None and previous != instance.status:
+        OrderStatusHistory.objects.create(
+            order=instance,
+            from_status=previous,
+            to_status=instance.status,
+            changed_by=getattr(instance, "_changed_by", None),
+        )
+        sales.record_status_change(instance, previous)
+    instance._previous_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def remove_sales_rollup_on_delete(sender, instance, **kwargs):
+    sales.record_deleted(instance)
+
+
+@receiver(user_logged_in)
+def stamp_session_refresh(sender, request, user, **kwargs):
+    """登入時記錄 session 寫入時間，登入後的請求不必再為了滑動過期多存一次（見 config/sessions.py）"""
+    if request is not None and hasattr(request, "session"):
+        request.session[sessions.REFRESHED_KEY] = int(time.time())
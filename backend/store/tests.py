@@ -1,3 +1,1340 @@
-from django.test import TestCase
+import datetime as dt
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from config import db_pool, db_router, fastjson, sessions
+from config.instrumentation import RequestMetricsMiddleware, registry
+
+from . import async_views, catalog, catalog_io, fast_serializers, idempotency, order_numbers, order_queue, order_status, pagination, pricing, sales, search, throttling
+from .catalog_io import iter_records, write_records
+from .models import (
+    DailyProductSales,
+    DailySalesDelta,
+    DailySalesSummary,
+    IdempotencyKey,
+    Order,
+    OrderItem,
+    OrderStatusHistory,
+    OrderTicket,
+    Product,
+    ProductVariant,
+    ShopSettings,
+    Tag,
+)
+from .serializers import OrderSerializer, ProductSerializer
+
+
+def order_payload(items, **fields):
+    """下單 API 的請求內容，fields 覆寫客戶資料"""
+    return {
+        "customer_name": "王小明",
+        "customer_phone": "0912-345-678",
+        "pickup_store_address": "台北市",
+        "items": items,
+        **fields,
+    }
+
+
+def post_order(client, items, **extra):
+    """以 client 呼叫下單 API，extra 傳給 client.post（header、REMOTE_ADDR 等）"""
+    return client.post("/api/orders/create/", order_payload(items), format="json", **extra)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tag = Tag.objects.create(name="零食")
+        self.product = Product.objects.create(name="鳳梨酥", price=Decimal("120"), description="台灣伴手禮")
+        self.product.tags.add(self.tag)
+        ProductVariant.objects.create(product=self.product, name="六入", price=Decimal("300"))
+        Product.objects.create(name="茶葉", price=Decimal("500"))
+        Product.objects.create(name="下架品", price=Decimal("1"), is_active=False)
+
+    def _names(self, params=None):
+        params = {"paginate": "false", **(params or {})}
+        return [p["name"] for p in self.client.get("/api/products/", params).json()]
+
+    def test_matches_serializer_output(self):
+        qs = Product.objects.filter(is_active=True).prefetch_related("tags", "variants").order_by("id")
+        resp = self.client.get("/api/products/", {"paginate": "false"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), ProductSerializer(qs, many=True).data)
+
+    def test_warm_snapshot_uses_no_queries(self):
+        self.client.get("/api/products/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/products/")
+
+    def test_filters_by_tag_and_search(self):
+        self.assertEqual(self._names({"tags": "零食,不存在"}), ["鳳梨酥"])
+        self.assertEqual(self._names({"search": "伴手"}), ["鳳梨酥"])
+
+    def test_admin_edits_visible_immediately(self):
+        self.client.get("/api/products/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "新鳳梨酥"
+            self.product.save()
+        self.assertIn("新鳳梨酥", self._names())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.tags.clear()
+        self.assertEqual(self._names({"tags": "零食"}), [])
+
+
+class CatalogConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="鳳梨酥", price=Decimal("120"))
+        Tag.objects.create(name="零食")
+
+    def test_revalidation_returns_304_without_queries(self):
+        for url in ["/api/products/", f"/api/products/{self.product.pk}/", "/api/tags/"]:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("Last-Modified", resp.headers)
+            with self.assertNumQueries(0):
+                resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp.headers["ETag"])
+            self.assertEqual(resp.status_code, 304)
+
+    def test_etag_changes_after_edit(self):
+        etag = self.client.get("/api/products/").headers["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.create(product=self.product, name="六入", price=Decimal("300"))
+        resp = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+        self.assertTrue(resp.json()["results"][0]["has_variants"])
+
+    @override_settings(CACHE_VERSION_TTL=5)
+    def test_etag_survives_local_version_expiry(self):
+        # 本機記憶體 cache 的版本號過期後由目錄內容重算：內容沒變就還是 304，也不重建快照
+        etag = self.client.get("/api/products/").headers["ETag"]
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + 6):
+            self.assertEqual(self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            with mock.patch.object(catalog._snapshot, "load", side_effect=AssertionError("重建快照")):
+                self.assertEqual(self.client.get("/api/products/").headers["ETag"], etag)
+        cache.clear()  # 其他 worker（cache 是空的）算出相同的 ETag
+        self.assertEqual(self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(5):
+            Product.objects.create(name=f"商品{i}", price=Decimal("10"))
+        for i in range(5):
+            order = Order.objects.create(
+                order_no=f"MKT-TEST-{i}",
+                customer_name="王小明",
+                customer_phone="0912345678",
+                pickup_store_address="台北市",
+                total_amount=Decimal("10"),
+            )
+            OrderItem.objects.create(
+                order=order, product_name_snapshot="商品", unit_price_snapshot=Decimal("10"),
+                quantity=1, line_total=Decimal("10"),
+            )
+        self.admin = User.objects.create_superuser("admin", password="pw")
+
+    def _walk(self, url):
+        seen = []
+        while url:
+            body = self.client.get(url).json()
+            seen.extend(body["results"])
+            url = body["next"]
+        return seen
+
+    def test_product_pages_cover_catalog_once(self):
+        products = self._walk("/api/products/?page_size=2&fields=id,name")
+        self.assertEqual([p["name"] for p in products], [f"商品{i}" for i in range(5)])
+        self.assertEqual(set(products[0]), {"id", "name"})
+
+    def test_order_pages_are_stable_under_inserts(self):
+        self.client.force_authenticate(self.admin)
+        first = self.client.get("/api/orders/", {"page_size": 2}).json()
+        Order.objects.create(
+            order_no="MKT-TEST-NEW", customer_name="新", customer_phone="0912345678",
+            pickup_store_address="台北市", total_amount=Decimal("10"),
+        )
+        rest = self._walk(first["next"])
+        order_nos = [o["order_no"] for o in first["results"] + rest]
+        self.assertEqual(order_nos, [f"MKT-TEST-{i}" for i in reversed(range(5))])
+
+    def test_order_sparse_fields_skip_items(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            body = self.client.get("/api/orders/", {"fields": "order_no,status"}).json()
+        self.assertEqual(set(body["results"][0]), {"order_no", "status"})
+
+    def test_unpaginated_opt_in(self):
+        self.client.force_authenticate(self.admin)
+        body = self.client.get("/api/orders/", {"paginate": "false"}).json()
+        self.assertEqual(len(body), 5)
+        self.assertEqual(len(body[0]["items"]), 1)
+
+
+class OrderPricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.products = []
+        for i in range(20):
+            product = Product.objects.create(name=f"商品{i}", price=Decimal("100"))
+            ProductVariant.objects.create(product=product, name="大", price=Decimal("150"))
+            ProductVariant.objects.create(product=product, name="停用", price=Decimal("1"), is_active=False)
+            self.products.append(product)
+
+    def test_prices_variants_and_plain_lines(self):
+        product = self.products[0]
+        big = product.variants.get(name="大")
+        resp = post_order(self.client, [
+            {"product_id": product.id, "variant_id": big.id, "quantity": 2},
+            {"product_id": product.id, "quantity": 1},
+        ])
+        self.assertEqual(resp.status_code, 201)
+        items = resp.json()["items"]
+        self.assertEqual([i["product_name_snapshot"] for i in items], ["商品0 - 大", "商品0"])
+        self.assertEqual([i["line_total"] for i in items], ["300", "100"])
+        self.assertEqual(resp.json()["total_amount"], "400")
+
+    def test_rejects_unknown_variants(self):
+        product, other = self.products[:2]
+        disabled = product.variants.get(name="停用")
+        for variant_id in (disabled.id, other.variants.get(name="大").id, 0):
+            resp = post_order(self.client, [
+                {"product_id": product.id, "variant_id": variant_id, "quantity": 1},
+            ])
+            self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_grow_with_lines(self):
+        def post(products):
+            items = [{"product_id": p.id, "variant_id": p.variants.first().id, "quantity": 1} for p in products]
+            payload = order_payload(items)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.post("/api/orders/create/", payload, format="json")
+            self.assertEqual(resp.status_code, 201)
+            return len(ctx.captured_queries)
+
+        post(self.products[:1])  # 首次下單會載入 ShopSettings 快取，不列入比較
+        self.assertEqual(post(self.products[:1]), post(self.products))
+
+    def test_rejects_inactive_products(self):
+        product = self.products[0]
+        product.is_active = False
+        product.save()
+        resp = post_order(self.client, [{"product_id": product.id, "quantity": 1}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    def test_seed_and_benchmark_report(self):
+        call_command("seed_benchmark_data", products=5, variants=2, tags=3, orders=5, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(ProductVariant.objects.count(), 10)
+
+        out = StringIO()
+        call_command("benchmark_api", requests=4, concurrency=1, stdout=out)
+        report = json.loads(out.getvalue())
+        for name, stats in report["endpoints"].items():
+            self.assertEqual(stats["requests"], 4, name)
+            self.assertEqual(stats["errors"], 0, name)
+            self.assertLessEqual(stats["latency_ms"]["p50"], stats["latency_ms"]["p99"])
+
+    def test_benchmarks_refuse_non_sqlite_databases(self):
+        for command in ("seed_benchmark_data", "benchmark_api", "benchmark_sessions"):
+            with mock.patch.object(connection, "vendor", "postgresql"), self.assertRaises(CommandError):
+                call_command(command, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+
+@modify_settings(MIDDLEWARE={"prepend": "config.instrumentation.RequestMetricsMiddleware"})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+        Product.objects.create(name="鳳梨酥", price=Decimal("120"))
+
+    def test_server_timing_and_histogram(self):
+        resp = self.client.get("/api/products/")
+        self.assertIn('desc="', resp.headers["Server-Timing"])
+        self.assertIn("render;dur=", resp.headers["Server-Timing"])
+
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        resp = self.client.get("/api/admin/metrics/")
+        self.assertEqual(resp.status_code, 200)
+        stats = resp.json()["views"]["products-list"]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(sum(stats["histogram_ms"].values()), 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get("/api/admin/metrics/").status_code, 403)
+
+    async def test_async_middleware_counts_queries_from_orm_threads(self):
+        async def view(request):
+            # 與 async view 相同：ORM 在 sync_to_async 的執行緒上執行
+            await Product.objects.acount()
+            await sync_to_async(lambda: list(Tag.objects.all()))()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        resp = await middleware(AsyncRequestFactory().get("/"))
+        self.assertIn('desc="2 queries"', resp.headers["Server-Timing"])
+
+
+class ConnectionPoolTests(TestCase):
+    POSTGRES = {"ENGINE": "django.db.backends.postgresql", "NAME": "market", "OPTIONS": {}}
+
+    @mock.patch.dict(os.environ, {"DATABASE_POOL_MIN_SIZE": "1", "DATABASE_POOL_MAX_SIZE": "4"})
+    def test_configure_pool_or_fallback(self):
+        with mock.patch.object(db_pool, "pool_available", return_value=True):
+            config = db_pool.configure(dict(self.POSTGRES, OPTIONS={}))
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertEqual(config["OPTIONS"]["pool"], {"min_size": 1, "max_size": 4, "timeout": 10.0})
+
+        with mock.patch.object(db_pool, "pool_available", return_value=False):
+            config = db_pool.configure(dict(self.POSTGRES, OPTIONS={}))
+        self.assertEqual(config["CONN_MAX_AGE"], 600)
+        self.assertNotIn("pool", config["OPTIONS"])
+
+    def test_pool_stats_on_metrics_endpoint(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {
+            "pool_min": 2, "pool_max": 10, "pool_size": 5, "pool_available": 1,
+            "requests_waiting": 3, "requests_num": 40, "requests_queued": 4, "requests_wait_ms": 100,
+        }
+        fake = {"default": mock.Mock(pool=pool), "replica_0": mock.Mock(pool=None)}
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        with mock.patch.object(db_pool, "connections", fake):
+            pools = client.get("/api/admin/metrics/").json()["pools"]
+        self.assertEqual(list(pools), ["default"])
+        self.assertEqual(pools["default"]["checked_out"], 4)
+        self.assertEqual(pools["default"]["waiting"], 3)
+        self.assertEqual(pools["default"]["wait_ms_avg"], 25.0)
+
+    @skipUnless(connection.vendor == "postgresql" and connection.settings_dict["OPTIONS"].get("pool"),
+                "需要以 DATABASE_URL 指向 PostgreSQL 並安裝 psycopg_pool")
+    def test_real_pool_stats(self):
+        Product.objects.exists()  # 確保測試交易的連線已從池中借出
+        stats = db_pool.stats()["default"]
+        self.assertGreaterEqual(stats["checked_out"], 1)
+        self.assertLessEqual(stats["size"], stats["max_size"])
+
+
+class ShopSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.order = Order.objects.create(
+            order_no="MKT-TEST-1", customer_name="王小明", customer_phone="0912345678",
+            pickup_store_address="台北市", total_amount=Decimal("10"),
+        )
+
+    def test_row_created_by_migrate(self):
+        self.assertTrue(ShopSettings.objects.filter(singleton_key="default").exists())
+
+    def test_cached_read_and_invalidation(self):
+        url = f"/api/orders/{self.order.order_no}/"
+        self.client.get(url)
+        with self.assertNumQueries(2):  # order + items，不再讀寫設定
+            self.client.get(url)
+
+        settings = ShopSettings.objects.get(singleton_key="default")
+        settings.line_oa_id = "@newshop"
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+        self.assertEqual(self.client.get(url).json()["line"]["oa_id"], "@newshop")
+
+    @override_settings(CACHE_VERSION_TTL=5)
+    def test_local_cache_versions_expire(self):
+        # 其他 worker 的修改不會遞增這個 process 的版本號：版本號過期後重新載入
+        url = f"/api/orders/{self.order.order_no}/"
+        self.client.get(url)
+        ShopSettings.objects.filter(singleton_key="default").update(line_oa_id="@otherworker")
+        self.assertNotEqual(self.client.get(url).json()["line"]["oa_id"], "@otherworker")
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + 6):
+            self.assertEqual(self.client.get(url).json()["line"]["oa_id"], "@otherworker")
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.cake = Product.objects.create(name="土鳳梨酥", price=Decimal("300"), description="Pineapple cake")
+        self.tea = Product.objects.create(name="阿里山烏龍茶", price=Decimal("500"), description="搭配鳳梨酥")
+
+    def _search(self, text):
+        resp = self.client.get("/api/products/", {"search": text, "paginate": "false"})
+        return [p["name"] for p in resp.json()]
+
+    def test_tokenizer_bigrams(self):
+        self.assertEqual(search.query_terms("鳳梨酥 Cake"), [("鳳梨", False), ("梨酥", False), ("cake", True)])
+        self.assertIn("烏龍", search.index_tokens("阿里山烏龍茶"))
+
+    def test_cjk_substring_ranked_by_name(self):
+        self.assertEqual(self._search("鳳梨酥"), ["土鳳梨酥", "阿里山烏龍茶"])
+        self.assertEqual(self._search("茶"), ["阿里山烏龍茶"])
+        self.assertEqual(self._search("烏龍"), ["阿里山烏龍茶"])
+        self.assertEqual(self._search("龍烏"), [])
+
+    def test_latin_prefix_case_insensitive(self):
+        self.assertEqual(self._search("PINE"), ["土鳳梨酥"])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.tea.name = "凍頂烏龍"
+        self.tea.save()
+        self.assertEqual(self._search("阿里山"), [])
+        self.cake.delete()
+        self.assertEqual(self._search("鳳梨"), ["凍頂烏龍"])
+
+
+class CatalogImportExportTests(TestCase):
+    JSONL = (
+        '{"sku": "A1", "name": "鳳梨酥", "price": "120", "tags": ["零食", "伴手禮"],'
+        ' "variants": [{"name": "六入", "price": "300"}, {"name": "十二入", "price": "550"}]}\n'
+        '{"sku": "B2", "name": "茶葉", "price": "500", "tags": ["茶"]}\n'
+    )
+
+    def _import(self, content, fmt="jsonl"):
+        path = self._write(content, fmt)
+        call_command("import_catalog", path, batch_size=1, stdout=StringIO())
+
+    def _write(self, content, fmt):
+        f = tempfile.NamedTemporaryFile("w", suffix=f".{fmt}", delete=False, encoding="utf-8")
+        self.addCleanup(os.unlink, f.name)
+        with f:
+            f.write(content)
+        return f.name
+
+    def test_import_upserts_by_sku(self):
+        self._import(self.JSONL)
+        self._import(self.JSONL.replace('"120"', '"150"').replace('"零食", ', ""))
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(ProductVariant.objects.count(), 2)
+        product = Product.objects.get(sku="A1")
+        self.assertEqual(product.price, Decimal("150"))
+        self.assertEqual([t.name for t in product.tags.all()], ["伴手禮"])
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(search.search_product_ids("鳳梨"), [product.id])
+
+    def test_csv_round_trip(self):
+        self._import(self.JSONL)
+        out = StringIO()
+        write_records(iter_records(), out, "csv")
+        Product.objects.all().delete()
+        self._import(out.getvalue(), fmt="csv")
+        self.assertEqual(
+            sorted(Product.objects.values_list("sku", "name", "price")),
+            [("A1", "鳳梨酥", Decimal("120")), ("B2", "茶葉", Decimal("500"))],
+        )
+        self.assertEqual(ProductVariant.objects.filter(product__sku="A1").count(), 2)
+
+    def test_products_without_sku_round_trip(self):
+        created = Product.objects.create(name="後台新增", price=Decimal("100"))
+        self.assertEqual(created.sku, f"ID-{created.pk}")
+        Product.objects.bulk_create([Product(name="舊資料", price=Decimal("50"))])  # 不觸發 signal
+        self.assertEqual(catalog_io.fill_missing_skus(), 1)
+
+        out = StringIO()
+        write_records(iter_records(), out, "jsonl")
+        Product.objects.update(price=Decimal("1"))
+        self._import(out.getvalue())
+        self.assertEqual(sorted(Product.objects.values_list("name", "price")),
+                         [("後台新增", Decimal("100")), ("舊資料", Decimal("50"))])
+
+    def test_malformed_rows_report_line(self):
+        bad_lines = [
+            '{"sku": "A1", "name": "鳳梨酥", "price": "120", "variants": [{"price": "300"}]}',
+            '{"sku": "A1", "name": "鳳梨酥", "price": "120", "variants": [{"name": "六入", "price": "300", "order": "abc"}]}',
+            '{"sku": "A1", "name": "鳳梨酥", "price": "120", "variants": [{"name": "六入", "price": "300", "order": -1}]}',
+            '{"sku": "A1", "name": "鳳梨酥", "price": "120.5"}',
+            '{"sku": "A1", "name": "鳳梨酥", "price": "NaN"}',
+            '{"sku": "A1", "name": "鳳梨酥", "price": "Infinity"}',
+            '["A1", "鳳梨酥"]',
+        ]
+        for line in bad_lines:
+            with self.subTest(line=line), self.assertRaisesMessage(CommandError, "第 1 行"):
+                self._import(line + "\n")
+        self.assertFalse(Product.objects.exists())
+
+    def test_explicit_zero_variant_order_is_kept(self):
+        self._import(
+            '{"sku": "C3", "name": "禮盒", "price": "100",'
+            ' "variants": [{"name": "大", "price": "200", "order": 5}, {"name": "小", "price": "150", "order": 0}]}\n'
+        )
+        self.assertEqual(
+            dict(ProductVariant.objects.filter(product__sku="C3").values_list("name", "order")),
+            {"大": 5, "小": 0},
+        )
+
+    def test_export_reports_to_command_stderr(self):
+        self._import(self.JSONL)
+        path = self._write("", "jsonl")
+        err = StringIO()
+        call_command("export_catalog", path, stdout=StringIO(), stderr=err)
+        self.assertIn("已匯出 2 個商品", err.getvalue())
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["sku"] for line in f], ["A1", "B2"])
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        for i, status_value in enumerate([Order.Status.NEW, Order.Status.CONFIRMED, Order.Status.CONFIRMED]):
+            order = Order.objects.create(
+                order_no=f"MKT-EXP-{i}", customer_name="王小明", customer_phone="0912345678",
+                pickup_store_address="台北市", total_amount=Decimal("30"), status=status_value,
+            )
+            for name in ("鳳梨酥", "茶葉"):
+                OrderItem.objects.create(
+                    order=order, product_name_snapshot=name, unit_price_snapshot=Decimal("15"),
+                    quantity=1, line_total=Decimal("15"),
+                )
+
+    def _body(self, resp):
+        return b"".join(resp.streaming_content).decode("utf-8")
+
+    def test_csv_stream_filters_by_status(self):
+        resp = self.client.get("/api/orders/export/", {"status": "CONFIRMED"})
+        self.assertEqual(resp.status_code, 200)
+        lines = self._body(resp).lstrip("\ufeff").splitlines()
+        self.assertTrue(lines[0].startswith("order_no,created_at,status"))
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], ["MKT-EXP-1"] * 2 + ["MKT-EXP-2"] * 2)
+
+    def test_ndjson_and_date_range(self):
+        today = timezone.localdate().isoformat()
+        resp = self.client.get("/api/orders/export/", {"output": "ndjson", "from": today, "to": today})
+        rows = [json.loads(line) for line in self._body(resp).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["product_name_snapshot"], "鳳梨酥")
+
+        resp = self.client.get("/api/orders/export/", {"output": "ndjson", "to": "2000-01-01"})
+        self.assertEqual(self._body(resp), "")
+
+    def test_rejects_bad_params_and_anonymous(self):
+        self.assertEqual(self.client.get("/api/orders/export/", {"from": "yesterday"}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/orders/export/").status_code, 403)
+
+
+class OrderNumberTests(TestCase):
+    def setUp(self):
+        order_numbers.reset()
+
+    def test_no_collisions_across_threads_and_workers(self):
+        order_numbers.generate()  # 先在主執行緒登記 worker
+
+        def burst(_):
+            return [order_numbers.generate() for _ in range(500)]
+
+        numbers = []
+        for _ in range(3):  # 模擬 3 個 process：各自重新登記 worker
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                numbers.extend(n for batch in pool.map(burst, range(8)) for n in batch)
+            order_numbers.reset()
+            order_numbers.generate()
+
+        self.assertEqual(len(numbers), 3 * 8 * 500)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertTrue(all(len(n) <= 32 and n.startswith("MKT-") for n in numbers))
+
+    def test_unique_part_ignores_random_suffix(self):
+        a, b = order_numbers.generate(), order_numbers.generate()
+        self.assertNotEqual(a.rsplit("-", 1)[0], b.rsplit("-", 1)[0])
+
+    def test_date_never_moves_backwards(self):
+        # 跨日前後的執行緒交錯讀到日期：晚讀到前一天的不能把流水號歸零
+        days = [dt.date(2026, 1, 1), dt.date(2026, 1, 2), dt.date(2026, 1, 1), dt.date(2026, 1, 2)]
+        with mock.patch.object(order_numbers.timezone, "localdate", side_effect=days):
+            parts = [order_numbers.generate().split("-") for _ in days]
+        self.assertEqual(
+            [(p[1], p[3]) for p in parts],
+            [("20260101", "1"), ("20260102", "1"), ("20260102", "2"), ("20260102", "3")],
+        )
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="限量", price=Decimal("100"), stock=5)
+        self.variant = ProductVariant.objects.create(product=self.product, name="大", price=Decimal("150"), stock=2)
+        self.untracked = Product.objects.create(name="現做", price=Decimal("50"))
+
+    def _stock(self):
+        self.product.refresh_from_db()
+        self.variant.refresh_from_db()
+        return self.product.stock, self.variant.stock
+
+    def test_decrements_per_sku(self):
+        resp = post_order(self.client, [
+            {"product_id": self.product.id, "quantity": 2},
+            {"product_id": self.product.id, "variant_id": self.variant.id, "quantity": 1},
+            {"product_id": self.product.id, "quantity": 1},
+            {"product_id": self.untracked.id, "quantity": 99},
+        ])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self._stock(), (2, 1))
+        self.untracked.refresh_from_db()
+        self.assertIsNone(self.untracked.stock)
+
+    def test_out_of_stock_rolls_back_whole_order(self):
+        resp = post_order(self.client, [
+            {"product_id": self.product.id, "quantity": 1},
+            {"product_id": self.product.id, "variant_id": self.variant.id, "quantity": 3},
+        ])
+        self.assertEqual(resp.status_code, 409)
+        self.assertIn("限量 - 大", resp.json()["detail"])
+        self.assertEqual(self._stock(), (5, 2))
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancel_releases_stock_once(self):
+        resp = post_order(self.client, [{"product_id": self.product.id, "variant_id": self.variant.id, "quantity": 2}])
+        self.assertEqual(self._stock(), (5, 0))
+        order = Order.objects.get(order_no=resp.json()["order_no"])
+
+        order.status = Order.Status.CANCELLED
+        order.save()
+        order.save()
+        Order.objects.get(pk=order.pk).save()  # 另一個實例（旗標已是 True）也不會重複歸還
+        self.assertEqual(self._stock(), (5, 2))
+
+    def test_cancel_releases_only_reserved_stock(self):
+        # 下單時不追蹤庫存，之後才設定庫存：取消時不能把沒扣過的數量加回去
+        resp = post_order(self.client, [{"product_id": self.untracked.id, "quantity": 3}])
+        order = Order.objects.get(order_no=resp.json()["order_no"])
+        Product.objects.filter(pk=self.untracked.pk).update(stock=5)
+
+        order.status = Order.Status.CANCELLED
+        order.save()
+        self.untracked.refresh_from_db()
+        self.assertEqual(self.untracked.stock, 5)
+
+        resp = post_order(self.client, [{"product_id": self.product.id, "quantity": 2}])
+        order = Order.objects.get(order_no=resp.json()["order_no"])
+        order_status.transition(Order.objects.filter(pk=order.pk), Order.Status.CANCELLED, None)
+        self.assertEqual(self._stock(), (5, 2))
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="商品", price=Decimal("100"))
+        self.payload = order_payload([{"product_id": self.product.id, "quantity": 1}])
+
+    def _post(self, payload, key="retry-1"):
+        return self.client.post("/api/orders/create/", payload, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_original_response_without_touching_orders(self):
+        first = self._post(self.payload)
+        self.assertEqual(first.status_code, 201)
+
+        with self.assertNumQueries(0):
+            again = self._post(self.payload)
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+
+        cache.clear()  # cache 掉了改從資料表回放
+        with self.assertNumQueries(1):
+            self.assertEqual(self._post(self.payload).json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self._post(self.payload, key="retry-2").status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_different_payload(self):
+        self._post(self.payload)
+        self.payload["items"][0]["quantity"] = 2
+        self.assertEqual(self._post(self.payload).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        bad = dict(self.payload, items=[{"product_id": 999999, "quantity": 1}])
+        self.assertEqual(self._post(bad).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post(self.payload).status_code, 201)
+
+    def test_duplicate_waits_for_in_flight_request(self):
+        claim = idempotency.begin("retry-1", self.payload)
+        body = {"order_no": "MKT-TEST"}
+
+        def finish_in_flight(_):
+            claim.complete(201, body)
+
+        with mock.patch.object(idempotency.time, "sleep", side_effect=finish_in_flight):
+            resp = self._post(self.payload)
+        self.assertEqual((resp.status_code, resp.json()), (201, body))
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_duplicate_gives_up_after_wait(self):
+        idempotency.begin("retry-1", self.payload)
+        resp = self._post(self.payload)
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp["Retry-After"], "1")
+
+    def test_purge_expired(self):
+        self._post(self.payload)
+        self._post(self.payload, key="retry-2")
+        IdempotencyKey.objects.filter(key=idempotency._sha256("retry-1")).update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", batch_size=1, stdout=StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+@override_settings(ORDER_INTAKE_QUEUED=True)
+class QueuedOrderIntakeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="搶購品", price=Decimal("100"), stock=3)
+        self.other = Product.objects.create(name="一般品", price=Decimal("50"))
+
+    def test_enqueue_then_worker_creates_order(self):
+        resp = post_order(self.client, [{"product_id": self.product.id, "quantity": 2}, {"product_id": self.other.id, "quantity": 1}])
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.json()["total_amount"], "250")
+        self.assertFalse(Order.objects.exists())
+
+        pending = self.client.get(resp["Location"])
+        self.assertEqual(pending.json()["status"], "PENDING")
+        self.assertEqual(pending["Retry-After"], "1")
+
+        out = StringIO()
+        call_command("run_order_worker", once=True, stdout=out)
+        self.assertIn("已處理 1 張", out.getvalue())
+
+        done = self.client.get(resp["Location"]).json()
+        self.assertEqual(done["status"], "DONE")
+        order = Order.objects.get()
+        self.assertEqual(done["order"]["order_no"], order.order_no)
+        self.assertEqual(done["order"]["total_amount"], "250")
+        self.assertIn("transfer", done["order"])
+        self.assertEqual(order.items.count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_batch_creates_many_orders_and_fails_out_of_stock(self):
+        for _ in range(4):
+            self.assertEqual(post_order(self.client, [{"product_id": self.product.id, "quantity": 1}]).status_code, 202)
+        self.assertEqual(order_queue.drain_once(batch_size=10), 4)
+        self.assertEqual(order_queue.drain_once(batch_size=10), 0)
+
+        statuses = list(OrderTicket.objects.order_by("id").values_list("status", flat=True))
+        self.assertEqual(statuses, ["DONE", "DONE", "DONE", "FAILED"])
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(OrderItem.objects.count(), 3)
+        failed = OrderTicket.objects.get(status=OrderTicket.Status.FAILED)
+        self.assertIn("庫存不足", self.client.get(f"/api/orders/tickets/{failed.ticket}/").json()["detail"])
+
+    def test_failed_batch_goes_back_to_queue(self):
+        post_order(self.client, [{"product_id": self.other.id, "quantity": 1}])
+        with mock.patch.object(order_queue.pricing, "price_orders", side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                order_queue.drain_once()
+        self.assertEqual(OrderTicket.objects.get().status, OrderTicket.Status.PENDING)
+        self.assertEqual(order_queue.drain_once(), 1)
+        self.assertEqual(OrderTicket.objects.get().status, OrderTicket.Status.DONE)
+
+    def test_malformed_ticket_fails_without_blocking_batch(self):
+        post_order(self.client, [{"product_id": self.product.id, "quantity": 1}])
+        post_order(self.client, [{"product_id": self.product.id, "quantity": 1}])
+        bad, good = OrderTicket.objects.order_by("id")
+        del bad.payload["customer_name"]
+        bad.save(update_fields=["payload"])
+
+        out = StringIO()
+        call_command("run_order_worker", once=True, stdout=out)
+        self.assertIn("已處理 2 張", out.getvalue())
+
+        bad.refresh_from_db()
+        good.refresh_from_db()
+        self.assertEqual(bad.status, OrderTicket.Status.FAILED)
+        self.assertIn("KeyError", bad.error)
+        self.assertIsNotNone(bad.processed_at)
+        self.assertEqual(good.status, OrderTicket.Status.DONE)
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)  # 失敗那張扣的庫存跟著回滾
+        self.assertEqual(order_queue.drain_once(), 0)
+
+
+class AsyncViewsTests(TestCase):
+    """async 版本的回應必須與同步版逐位元組相同"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+        tag = Tag.objects.create(name="熱銷")
+        for i in range(3):
+            product = Product.objects.create(name=f"商品{i}", price=Decimal("100"), description="好吃")
+            product.tags.add(tag)
+            ProductVariant.objects.create(product=product, name="大", price=Decimal("150"))
+        self.product = product
+        post_order(self.client, [{"product_id": product.id, "quantity": 1}])
+        self.order = Order.objects.get()
+
+    async def _compare(self, view, path, **kwargs):
+        sync_resp = await sync_to_async(self.client.get)(path, HTTP_ACCEPT="application/json")
+        async_resp = await view.as_view()(self.factory.get(path), **kwargs)
+        self.assertEqual(async_resp.status_code, sync_resp.status_code)
+        self.assertEqual(async_resp.content, sync_resp.content)
+        return async_resp
+
+    async def test_responses_match_sync_views(self):
+        await self._compare(async_views.TagListView, "/api/tags/")
+        await self._compare(async_views.ProductListView, "/api/products/?page_size=2&fields=id,name,tags")
+        await self._compare(async_views.ProductListView, "/api/products/?paginate=false&search=商品&tags=熱銷")
+        await self._compare(async_views.ProductListView, "/api/products/?cursor=bogus")
+        await self._compare(async_views.ProductDetailView, f"/api/products/{self.product.id}/", pk=self.product.id)
+        await self._compare(async_views.ProductDetailView, "/api/products/999999/", pk=999999)
+        order_no = self.order.order_no
+        await self._compare(async_views.OrderDetailView, f"/api/orders/{order_no}/", order_no=order_no)
+        await self._compare(async_views.OrderDetailView, "/api/orders/nope/", order_no="nope")
+
+    async def test_conditional_get(self):
+        resp = await self._compare(async_views.ProductListView, "/api/products/")
+        request = self.factory.get("/api/products/", headers={"If-None-Match": resp["ETag"]})
+        self.assertEqual((await async_views.ProductListView.as_view()(request)).status_code, 304)
+
+
+class FastSerializerTests(TestCase):
+    """fast_serializers 的輸出必須與 DRF serializer 逐位元組相同"""
+
+    def setUp(self):
+        cache.clear()
+        tags = [Tag.objects.create(name=n) for n in ("冷凍", "熱銷", "新品")]
+        for i in range(5):
+            product = Product.objects.create(
+                name=f"商品{i}", price=Decimal(100 + i), description="說明\n第二行", image_url="https://x.test/a.png"
+            )
+            product.tags.add(tags[2], tags[0])
+            ProductVariant.objects.create(product=product, name="小", price=Decimal("90"), order=2)
+            ProductVariant.objects.create(product=product, name="大", price=Decimal("150"), order=1, is_active=False)
+        Product.objects.create(name="無規格", price=Decimal("50"))
+        Product.objects.create(name="下架", price=Decimal("50"), is_active=False)
+        for i in range(3):
+            order = Order.objects.create(
+                order_no=f"MKT-{i}", customer_name="王", customer_phone="0912345678",
+                pickup_store_address="台北", total_amount=Decimal("300"),
+            )
+            OrderItem.objects.create(order=order, product=product, product_name_snapshot="商品", unit_price_snapshot=Decimal("100"), quantity=3, line_total=Decimal("300"))
+            OrderItem.objects.create(order=order, product=None, product_name_snapshot="已刪除", unit_price_snapshot=Decimal("0"), quantity=1, line_total=Decimal("0"))
+
+    def test_products_match_drf(self):
+        qs = catalog.active_products_queryset()
+        expected = json.dumps(ProductSerializer(qs, many=True).data, ensure_ascii=False)
+        with self.assertNumQueries(3):
+            actual = json.dumps(fast_serializers.products(qs), ensure_ascii=False)
+        self.assertEqual(actual, expected)
+
+    def test_orders_match_drf(self):
+        qs = Order.objects.order_by("-created_at", "-id")
+        for fields in (None, ["order_no", "status"], ["items", "id"], ["nope"]):
+            expected = json.dumps(OrderSerializer(qs.prefetch_related("items"), many=True, fields=fields).data)
+            actual = json.dumps(fast_serializers.orders(list(fast_serializers.order_values(qs, fields)), fields))
+            self.assertEqual(actual, expected, fields)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_serializers", repeat=1, stdout=out)
+        results = json.loads(out.getvalue())["results"]
+        self.assertEqual(results["products"]["objects"], 6)
+        self.assertEqual(results["orders"]["objects"], 3)
+
+
+class FastJSONTests(TestCase):
+    payload = {
+        "price": Decimal("1200"),
+        "ratio": Decimal("0.10"),
+        "utc": dt.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt.timezone.utc),
+        "local": dt.datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt.timezone(dt.timedelta(hours=8))),
+        "day": dt.date(2026, 1, 2),
+        "at": dt.time(9, 30, 0, 123456),
+        "lazy": gettext_lazy("Not found."),
+        "text": "中文\u2028換行\u2029段落 \"引號\"",
+        "nested": [{"n": 1, "f": 1.5, "none": None, "ok": True}],
+        1: "int key",
+    }
+
+    def test_render_matches_drf(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(fastjson.FastJSONRenderer().render(self.payload), expected)
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.FastJSONRenderer().render(self.payload), expected)
+        # 要求縮排時退回 stdlib
+        self.assertEqual(
+            fastjson.FastJSONRenderer().render(self.payload, "application/json; indent=2"),
+            JSONRenderer().render(self.payload, "application/json; indent=2"),
+        )
+
+    def test_parser(self):
+        self.assertEqual(fastjson.FastJSONParser().parse(BytesIO('{"a": [1, "二"]}'.encode())), {"a": [1, "二"]})
+        resp = APIClient().post("/api/orders/create/", data="{bad json", content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("JSON parse error", resp.json()["detail"])
+
+    def test_benchmark_command(self):
+        Product.objects.create(name="商品", price=Decimal("100"))
+        out = StringIO()
+        call_command("benchmark_renderers", repeat=1, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["results"]["products"]["objects"], 1)
+
+
+class CatalogIndexTests(TestCase):
+    def setUp(self):
+        tag = Tag.objects.create(name="熱銷")
+        for i in range(20):
+            product = Product.objects.create(name=f"商品{i}", price=Decimal("100"), is_active=i % 4 != 0)
+            product.tags.add(tag)
+            for j in range(3):
+                ProductVariant.objects.create(product=product, name=f"規格{j}", price=Decimal("100"), is_active=j != 2)
+        self.product = product
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN 輸出格式依資料庫而異")
+    def test_explain_uses_indexes(self):
+        plan = Product.objects.filter(is_active=True).order_by("id").explain()
+        self.assertIn("store_product_active_id", plan)
+
+        plan = ProductVariant.objects.filter(is_active=True, product=self.product).explain()
+        self.assertIn("store_variant_active_order", plan)
+        self.assertNotIn("TEMP B-TREE", plan)  # 索引順序即 (order, id)，不需要另外排序
+
+        plan = Product.objects.filter(tags__name__in=["熱銷"]).explain()
+        self.assertIn("store_product_tags_tag_product", plan)
+
+    def test_pricing_skips_variant_query_without_variant_lines(self):
+        plain = Product.objects.create(name="單品", price=Decimal("50"))
+        with self.assertNumQueries(1):
+            priced = pricing.price_order([{"product_id": plain.id, "quantity": 1}, {"product_id": self.product.id, "quantity": 1}])
+        self.assertEqual(priced.total, Decimal("150"))
+        variant = self.product.variants.first()
+        with self.assertNumQueries(2):
+            pricing.price_order([{"product_id": plain.id, "quantity": 1}, {"product_id": self.product.id, "variant_id": variant.id, "quantity": 1}])
+
+
+@skipUnless(connection.vendor == "sqlite", "以 VACUUM INTO 複製 SQLite 檔案模擬 replica")
+class ReplicaRoutingTests(TransactionTestCase):
+    """primary 為測試資料庫，replica 是 setUp 當下以 VACUUM INTO 複製出的另一個 SQLite 檔案（之後的寫入不會同步過去）"""
+
+    databases = "__all__"  # 包含 setUpClass 動態加入的 replica_0（test runner 看不到這個 alias）
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.replica_path = os.path.join(cls.tmpdir.name, "replica.sqlite3")
+        connections.settings["replica_0"] = {**connections.settings["default"], "NAME": cls.replica_path}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica_0"].close()
+        del connections["replica_0"]
+        del connections.settings["replica_0"]
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="pw")
+        Tag.objects.create(name="舊標籤")
+        self.product = Product.objects.create(name="舊商品", price=Decimal("100"))
+        self._create_order("MKT-OLD")
+
+        connections["replica_0"].close()
+        if os.path.exists(self.replica_path):
+            os.remove(self.replica_path)
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM INTO %s", [self.replica_path])
+
+        Tag.objects.create(name="新標籤")
+        self.new_product = Product.objects.create(name="新商品", price=Decimal("200"))
+        self._create_order("MKT-NEW")
+        self.enterContext(override_settings(DATABASE_REPLICAS=["replica_0"]))
+
+    def _create_order(self, order_no):
+        Order.objects.create(
+            order_no=order_no, customer_name="王小明", customer_phone="0912345678",
+            pickup_store_address="台北市", total_amount=Decimal("100"),
+        )
+
+    def _order_nos(self, client):
+        return [o["order_no"] for o in client.get("/api/orders/", {"paginate": "false"}).json()]
+
+    def test_order_list_uses_replica_until_client_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(self._order_nos(client), ["MKT-OLD"])
+
+        resp = post_order(client, [{"product_id": self.new_product.id, "quantity": 1}])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.cookies[db_router.PIN_COOKIE].value, "1")
+
+        # 寫入過的用戶端改讀 primary
+        self.assertEqual(self._order_nos(client), [resp.json()["order_no"], "MKT-NEW", "MKT-OLD"])
+        other = APIClient()
+        other.force_authenticate(self.admin)
+        self.assertEqual(self._order_nos(other), ["MKT-OLD"])
+
+    def test_catalog_reads_use_primary(self):
+        # 目錄回應帶的 ETag 來自目前版本，內容必須跟著從 primary 讀，不能把 replica 的舊資料快取在新 ETag 下
+        client = APIClient()
+        self.assertEqual([t["name"] for t in client.get("/api/tags/").json()], ["新標籤", "舊標籤"])
+        self.assertEqual(client.get(f"/api/products/{self.new_product.id}/").status_code, 200)
+        names = [p["name"] for p in client.get("/api/products/", {"paginate": "false"}).json()]
+        self.assertEqual(names, ["舊商品", "新商品"])
+
+    async def test_async_catalog_reads_use_primary(self):
+        resp = await self.async_client.get(f"/api/products/{self.new_product.id}/")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_router_pins_primary_after_write(self):
+        router = db_router.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), "default")  # 請求以外（管理指令、worker）
+
+        token = db_router._state.set(db_router._RoutingState(pinned=False))
+        self.addCleanup(db_router._state.reset, token)
+        db_router._state.get().replica_ok = True
+        self.assertEqual(router.db_for_read(Product), "replica_0")
+        self.assertEqual(router.db_for_read(User), "default")
+        with db_router.use_primary():
+            self.assertEqual(router.db_for_read(Product), "default")
+        self.assertEqual(router.db_for_write(Product), "default")
+        self.assertEqual(router.db_for_read(Product), "default")
+        self.assertFalse(router.allow_migrate("replica_0", "store"))
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        self.tags = [Tag.objects.create(name=f"標籤{i}") for i in range(3)]
+
+    def _add_rows(self, n):
+        for _ in range(n):
+            product = Product.objects.create(name="商品", price=Decimal("100"))
+            product.tags.set(self.tags)
+            ProductVariant.objects.create(product=product, name="大", price=Decimal("120"))
+            Order.objects.create(order_no=order_numbers.generate(), customer_name="王", customer_phone="0912",
+                                 pickup_store_address="台北", total_amount=Decimal("100"))
+
+    def _query_count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_have_constant_query_count(self):
+        for url in ["/admin/store/product/", "/admin/store/order/", "/admin/store/order/?status__exact=NEW"]:
+            with self.subTest(url=url):
+                self._add_rows(2)
+                few = self._query_count(url)
+                self._add_rows(20)
+                self.assertEqual(self._query_count(url), few)
+
+    def test_variant_count_and_tags_in_product_list(self):
+        self._add_rows(1)
+        resp = self.client.get("/admin/store/product/")
+        self.assertContains(resp, "標籤0, 標籤1, 標籤2")
+        self.assertContains(resp, '<td class="field-get_variants_count">1</td>', html=True)
+
+    def test_estimated_count_only_for_unfiltered_large_tables(self):
+        self._add_rows(3)
+        orders = Order.objects.order_by("-created_at", "-id")
+        with mock.patch.object(pagination, "estimated_row_count", return_value=50_000):
+            self.assertEqual(pagination.EstimatedCountPaginator(orders, 100).count, 50_000)
+            filtered = orders.filter(status=Order.Status.NEW)
+            self.assertEqual(pagination.EstimatedCountPaginator(filtered, 100).count, 3)
+        with mock.patch.object(pagination, "estimated_row_count", return_value=42):
+            self.assertEqual(pagination.EstimatedCountPaginator(orders, 100).count, 3)
+        if connection.vendor != "postgresql":
+            self.assertIsNone(pagination.estimated_row_count(Order))
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tea = Product.objects.create(name="茶葉", price=Decimal("500"))
+        self.cake = Product.objects.create(name="鳳梨酥", price=Decimal("120"))
+        self.box = ProductVariant.objects.create(product=self.cake, name="六入", price=Decimal("300"))
+
+    def _order(self, items):
+        resp = post_order(self.client, items)
+        self.assertEqual(resp.status_code, 201)
+        return Order.objects.get(order_no=resp.json()["order_no"])
+
+    def _rollups(self):
+        sales.fold(batch_size=2)
+        return (
+            sorted(DailySalesSummary.objects.filter(order_count__gt=0)
+                   .values_list("date", "status", "order_count", "revenue")),
+            sorted(DailyProductSales.objects.filter(line_count__gt=0)
+                   .values_list("date", "status", "product_name", "line_count", "quantity", "revenue")),
+        )
+
+    def test_incremental_rollups_follow_status_and_match_rebuild(self):
+        today = timezone.localdate()
+        order = self._order([{"product_id": self.tea.id, "quantity": 2}])
+        self._order([{"product_id": self.cake.id, "variant_id": self.box.id, "quantity": 1},
+                     {"product_id": self.tea.id, "quantity": 1}])
+        order_queue.enqueue(order_payload(
+            [{"product_id": self.cake.id, "quantity": 3}],
+            customer_name="林", customer_phone="0922-345-678", pickup_store_address="台中",
+        ))
+        order_queue.drain_once()
+
+        order.status = Order.Status.CANCELLED
+        order.save()
+        days, products = self._rollups()
+        self.assertEqual(days, [(today, "CANCELLED", 1, Decimal("1000")), (today, "NEW", 2, Decimal("1160"))])
+        self.assertIn((today, "NEW", "茶葉", 1, 1, Decimal("500")), products)
+        self.assertIn((today, "CANCELLED", "茶葉", 1, 2, Decimal("1000")), products)
+
+        incremental = self._rollups()
+        DailySalesSummary.objects.update(order_count=0)
+        call_command("rebuild_sales_rollups", "--chunk-size", "2", stdout=StringIO())
+        self.assertEqual(self._rollups(), incremental)
+
+        order.delete()
+        self.assertEqual(self._rollups()[0], [(today, "NEW", 2, Decimal("1160"))])
+
+    def test_rebuild_skips_orders_created_mid_run(self):
+        for _ in range(3):
+            self._order([{"product_id": self.tea.id, "quantity": 1}])
+        trunc_date, created = sales.TruncDate, []
+
+        def create_order_once(*args, **kwargs):
+            # 第一批掃描時另一個請求下單：訂單與差額都在 rebuild 開始之後
+            if not created:
+                created.append(self._order([{"product_id": self.tea.id, "quantity": 1}]))
+            return trunc_date(*args, **kwargs)
+
+        with mock.patch.object(sales, "TruncDate", side_effect=create_order_once):
+            self.assertEqual(sales.rebuild(chunk_size=2), 3)
+        self.assertEqual(self._rollups()[0], [(timezone.localdate(), "NEW", 4, Decimal("2000"))])
+
+    def test_checkout_writes_deltas_without_locking_rollups(self):
+        self._order([{"product_id": self.tea.id, "quantity": 1}])
+        with CaptureQueriesContext(connection) as ctx:
+            self._order([{"product_id": self.tea.id, "quantity": 1}])
+        rollup_sql = [q["sql"] for q in ctx.captured_queries if re.search(r'"store_daily(salessummary|productsales)"', q["sql"])]
+        self.assertEqual(rollup_sql, [])  # 結帳不碰（不鎖）彙總表
+        self.assertEqual(DailySalesDelta.objects.count(), 2)
+
+        self.assertEqual(sales.fold(), 4)
+        self.assertFalse(DailySalesDelta.objects.exists())
+        self.assertEqual(self._rollups()[0], [(timezone.localdate(), "NEW", 2, Decimal("1000"))])
+
+    def test_report_reads_only_rollups(self):
+        self._order([{"product_id": self.tea.id, "quantity": 2}])
+        self._order([{"product_id": self.cake.id, "variant_id": self.box.id, "quantity": 5}])
+        cancelled = self._order([{"product_id": self.cake.id, "quantity": 9}])
+        cancelled.status = Order.Status.CANCELLED
+        cancelled.save()
+
+        today = timezone.localdate()
+        sales.fold()
+        with self.assertNumQueries(4):
+            data = sales.report(today - dt.timedelta(days=365), today, ["NEW", "CONFIRMED"])
+        self.assertEqual(data["totals"], {"order_count": 2, "revenue": "2500"})
+        self.assertEqual([p["product_name"] for p in data["top_products"]], ["鳳梨酥 - 六入", "茶葉"])
+        self.assertIsNone(data["pending_since"])
+
+        self.assertEqual(self.client.get("/api/reports/sales/").status_code, 403)
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        resp = self.client.get("/api/reports/sales/", {"status": "CANCELLED"})
+        self.assertEqual(resp.json()["days"], [{"date": today.isoformat(), "order_count": 1, "revenue": "1080"}])
+
+        # 報表 API 不併入差額，只回報尚未併入的時間
+        self._order([{"product_id": self.tea.id, "quantity": 1}])
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/reports/sales/").json()
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if re.match(r"\s*(INSERT|UPDATE|DELETE)", q["sql"])])
+        self.assertEqual(data["totals"], {"order_count": 2, "revenue": "2500"})
+        self.assertIsNotNone(data["pending_since"])
+        self.assertTrue(DailySalesDelta.objects.exists())
+        self.assertEqual(self.client.get("/api/reports/sales/", {"start": "2026-13-01"}).status_code, 400)
+
+
+@override_settings(STORE_THROTTLE_RATES={})  # 同一個 IP、手機號碼建立大量訂單
+class OrderStatusTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff = User.objects.create_superuser("staff", password="x")
+        self.product = Product.objects.create(name="限量", price=Decimal("100"), stock=100)
+
+    def _orders(self, n):
+        nos = []
+        for _ in range(n):
+            resp = post_order(self.client, [{"product_id": self.product.id, "quantity": 2}])
+            nos.append(resp.json()["order_no"])
+        return nos
+
+    def _post(self, order_nos, to_status):
+        self.client.force_authenticate(self.staff)
+        return self.client.post("/api/orders/status/", {"order_nos": order_nos, "status": to_status}, format="json")
+
+    def test_transitions_with_per_order_results(self):
+        a, b, c = self._orders(3)
+        resp = self._post([a, b, "NOPE"], "CONFIRMED")
+        self.assertEqual([r["result"] for r in resp.json()["results"]], ["changed", "changed", "not_found"])
+
+        resp = self._post([a, b, c], "CANCELLED")
+        self.assertEqual(resp.json()["counts"], {"changed": 3})
+        self.assertEqual([r["from_status"] for r in resp.json()["results"]], ["CONFIRMED", "CONFIRMED", "NEW"])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 100)
+
+        resp = self._post([a, c], "CONFIRMED")
+        self.assertEqual(resp.json()["counts"], {"invalid_transition": 2})
+        self.assertEqual(Order.objects.filter(status=Order.Status.CANCELLED).count(), 3)
+        self.assertEqual(
+            list(OrderStatusHistory.objects.filter(order__order_no=a).values_list("from_status", "to_status")),
+            [("NEW", "CONFIRMED"), ("CONFIRMED", "CANCELLED")],
+        )
+        sales.fold()
+        self.assertEqual(DailySalesSummary.objects.get(status="CANCELLED").order_count, 3)
+        self.assertFalse(DailySalesSummary.objects.filter(status="CONFIRMED", order_count__gt=0).exists())
+
+    def test_query_count_does_not_grow_with_orders(self):
+        def count(order_nos):
+            with CaptureQueriesContext(connection) as ctx:
+                order_status.transition(Order.objects.filter(order_no__in=order_nos), Order.Status.CANCELLED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(self._orders(2)), count(self._orders(20)))
+
+    def test_admin_action_and_single_save_history(self):
+        a, b = self._orders(2)
+        self.client.force_login(self.staff)
+        ids = list(Order.objects.order_by("id").values_list("id", flat=True))
+        resp = self.client.post("/admin/store/order/", {"action": "confirm_orders", "_selected_action": ids},
+                                follow=True)
+        self.assertContains(resp, "已變更 2 筆")
+
+        order = Order.objects.get(order_no=b)
+        order._changed_by = self.staff
+        order.status = Order.Status.CANCELLED
+        order.save()
+        history = OrderStatusHistory.objects.filter(order=order).last()
+        self.assertEqual((history.from_status, history.to_status), ("CONFIRMED", "CANCELLED"))
+        self.assertEqual(history.changed_by, self.staff)
+        self.assertEqual(Order.objects.get(order_no=a).status, Order.Status.CONFIRMED)
+
+        anonymous = APIClient().post("/api/orders/status/", {"order_nos": [a], "status": "CANCELLED"}, format="json")
+        self.assertEqual(anonymous.status_code, 403)
+
+
+@override_settings(STORE_THROTTLE_RATES={"browse": "3/min", "checkout": "3/min", "checkout_phone": "2/min"})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="茶葉", price=Decimal("500"))
+
+    def _order(self, phone, ip="10.0.0.1"):
+        payload = order_payload([{"product_id": self.product.id, "quantity": 1}], customer_phone=phone)
+        return self.client.post("/api/orders/create/", payload, format="json", REMOTE_ADDR=ip)
+
+    def test_checkout_limits_per_phone_and_ip(self):
+        self.assertEqual(self._order("0912-345-678").status_code, 201)
+        self.assertEqual(self._order("0912345678").status_code, 201)
+        resp = self._order("0912 345 678")  # 同一支手機（格式不同）
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp.headers["Retry-After"], "30")
+        self.assertEqual(self._order("0922-345-678").status_code, 201)  # 被拒的請求不扣 IP 額度
+        self.assertEqual(self._order("0933-345-678").status_code, 429)  # IP 額度用完
+        self.assertEqual(self._order("0933-345-678", ip="10.0.0.2").status_code, 201)
+
+    def test_browse_budget_is_separate_from_checkout(self):
+        order_no = self._order("0912-345-678").json()["order_no"]
+        # 同一個 IP（127.0.0.1）：查詢額度用完不影響下單
+        statuses = [self.client.get(f"/api/orders/{order_no}/").status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(self._order("0922-345-678", ip="127.0.0.1").status_code, 201)
+
+        request = AsyncRequestFactory().get(f"/api/orders/{order_no}/")
+        resp = async_to_sync(async_views.OrderDetailView.as_view())(request, order_no=order_no)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp.headers["Retry-After"], "20")
+
+    def test_bucket_refills_and_is_atomic(self):
+        b = throttling.Bucket("store:throttle:test", capacity=10, interval=6.0)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            waits = list(pool.map(lambda _: throttling.consume([b], now=1000.0), range(50)))
+        self.assertEqual(waits.count(0.0), 10)
+        self.assertEqual(throttling.consume([b], now=1005.0), 1.0)
+        self.assertEqual(throttling.consume([b], now=1006.0), 0.0)
+        self.assertEqual(throttling.parse_rate("20/min"), (20, 3.0))
+
+
+@override_settings(STORE_THROTTLE_RATES={})
+class SessionWriteTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("staff", password="x", is_staff=True))
+
+    def _get(self, path):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(path)
+        self.assertEqual(resp.status_code, 200)
+        writes = [q for q in ctx.captured_queries if "django_session" in q["sql"] and not q["sql"].startswith("SELECT")]
+        return resp, len(writes)
+
+    def test_session_saved_only_when_near_expiry(self):
+        resp, writes = self._get("/api/orders/")
+        self.assertEqual(writes, 0)
+        self.assertNotIn("sessionid", resp.cookies)
+
+        session = self.client.session
+        session[sessions.REFRESHED_KEY] -= 86400 // 2
+        session.save()
+        resp, writes = self._get("/api/orders/")
+        self.assertEqual(writes, 1)
+        self.assertIn("sessionid", resp.cookies)  # 延長 cookie 期限
+
+    def test_catalog_reads_never_persist_session(self):
+        session = self.client.session
+        session[sessions.REFRESHED_KEY] = 0
+        session.save()
+        for path in ("/api/products/", "/api/tags/"):
+            resp, writes = self._get(path)
+            self.assertEqual(writes, 0)
+            self.assertNotIn("sessionid", resp.cookies)
+
+    def test_purge_expired_in_batches(self):
+        expired = timezone.now() - dt.timedelta(seconds=1)
+        for i in range(5):
+            Session.objects.create(session_key=f"expired{i}", session_data="", expire_date=expired)
+        self.assertEqual(sessions.purge_expired(batch_size=2), 5)
+        self.assertEqual(Session.objects.count(), 1)  # setUp 登入的 session
@@ -0,0 +1,147 @@
+"""
+下單與訂單查詢的限流：存在共用 cache 的 token bucket（以 GCRA 實作，每個 bucket 只存一個時間戳）。
+
+DRF 內建的 throttle 每個請求先讀再寫 cache，多個 worker 同時請求會互相覆蓋，也需要多次往返。這裡：
+- Redis：一段 Lua script 檢查並扣除這個請求的所有 bucket（IP、手機號碼），原子執行、一次往返
+- 本機記憶體 cache（開發、測試）：以 process 內的 lock 保護，效果相同
+- 其他 cache backend：退回 get_many / set（不保證多個 worker 之間的原子性）
+
+任何一個 bucket 不足時整個請求被拒，其他 bucket 也不扣；回 429 並帶 Retry-After。
+額度設定見 settings.STORE_THROTTLE_RATES（格式同 DRF，例如 "20/min"：可連續用 20 次，每 3 秒回補 1 次）。
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = "store:throttle"
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+_LUA = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local interval = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or '0')
+    if tat < now then tat = now end
+    tats[i] = tat + interval
+    local allow_at = tats[i] - capacity * interval
+    if allow_at - now > 1e-6 then wait = math.max(wait, allow_at - now) end
+end
+if wait > 0 then return tostring(wait) end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+end
+return '0'
+"""
+
+_lock = threading.Lock()
+
+
+class Bucket(NamedTuple):
+    key: str
+    capacity: int
+    interval: float  # 回補一次額度的秒數
+
+
+def parse_rate(rate: str | None) -> tuple[int, float] | None:
+    """"20/min" → (20, 3.0)；空值代表不限流"""
+    if not rate:
+        return None
+    count, period = rate.split("/")
+    count = int(count)
+    return count, PERIODS[period.strip().lower()] / count
+
+
+def bucket(scope: str, ident: str) -> Bucket | None:
+    parsed = parse_rate(settings.STORE_THROTTLE_RATES.get(scope))
+    if parsed is None or not ident:
+        return None
+    return Bucket(f"{KEY_PREFIX}:{scope}:{ident}", *parsed)
+
+
+def _gcra(tats: dict, buckets: list[Bucket], now: float) -> tuple[float, dict]:
+    """與 _LUA 相同的計算：回傳 (需等待秒數, 新的時間戳)；等待秒數為 0 代表放行"""
+    wait, updated = 0.0, {}
+    for b in buckets:
+        tat = max(tats.get(b.key) or 0.0, now) + b.interval
+        allow_at = tat - b.capacity * b.interval
+        if allow_at - now > 1e-6:  # 忽略浮點誤差
+            wait = max(wait, allow_at - now)
+        updated[b.key] = tat
+    return wait, updated
+
+
+def consume(buckets: list[Bucket], now: float | None = None) -> float:
+    """每個 bucket 各扣 1 次額度，回傳需等待的秒數（0 代表放行）"""
+    if not buckets:
+        return 0.0
+    now = time.time() if now is None else now
+    cache = caches["default"]
+    if isinstance(cache, RedisCache):
+        client = cache._cache.get_client(write=True)
+        keys = [cache.make_and_validate_key(b.key) for b in buckets]
+        args = [now]
+        for b in buckets:
+            args += [b.capacity, b.interval]
+        return float(client.register_script(_LUA)(keys=keys, args=args))
+
+    with _lock:
+        wait, updated = _gcra(cache.get_many([b.key for b in buckets]), buckets, now)
+        if wait > 0:
+            return wait
+        for key, tat in updated.items():
+            cache.set(key, tat, timeout=math.ceil(tat - now))
+    return 0.0
+
+
+async def aconsume(buckets: list[Bucket]) -> float:
+    """async view 用：本機記憶體 cache 直接計算，其他 backend 的網路往返移到執行緒池"""
+    if isinstance(caches["default"], LocMemCache):
+        return consume(buckets)
+    return await sync_to_async(consume, thread_sensitive=False)(buckets)
+
+
+def _hashed(value: str) -> str:
+    # cache key 不保存手機號碼原文
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+class BrowseThrottle(BaseThrottle):
+    """訂單查詢、下單佇列輪詢：每個 IP 一個 bucket"""
+
+    def get_buckets(self, request) -> list[Bucket]:
+        return [b for b in [bucket("browse", self.get_ident(request))] if b]
+
+    def allow_request(self, request, view):
+        self.wait_seconds = consume(self.get_buckets(request))
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class CheckoutThrottle(BrowseThrottle):
+    """下單：每個 IP 與每個手機號碼各一個 bucket，一次往返同時扣除"""
+
+    def get_buckets(self, request) -> list[Bucket]:
+        phone = request.data.get("customer_phone") if hasattr(request.data, "get") else None
+        phone = re.sub(r"\D", "", phone) if isinstance(phone, str) else ""
+        buckets = [
+            bucket("checkout", self.get_ident(request)),
+            bucket("checkout_phone", _hashed(phone) if phone else ""),
+        ]
+        return [b for b in buckets if b]
@@ -1,25 +1,35 @@
+from django.conf import settings
 from django.urls import path
 
+from . import async_views, views
 from .views import (
     OrderCreateView,
-    OrderDetailView,
+    OrderExportView,
     OrderListView,
-    ProductDetailView,
-    ProductListView,
-    TagListView,
+    OrderStatusTransitionView,
+    OrderTicketView,
+    SalesReportView,
     csrf_token_view,
 )
 
+# ASGI 下（config/asgi.py 預設 ASYNC_VIEWS=True）唯讀端點改用原生 async view
+read_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     # CSRF Token API（資安：前端需要此 Token）
     path("csrf-token/", csrf_token_view, name="csrf-token"),
     # 公開 API（不需要認證）
-    path("tags/", TagListView.as_view(), name="tags-list"),
-    path("products/", ProductListView.as_view(), name="products-list"),
-    path("products/<int:pk>/", ProductDetailView.as_view(), name="products-detail"),
+    path("tags/", read_views.TagListView.as_view(), name="tags-list"),
+    path("products/", read_views.ProductListView.as_view(), name="products-list"),
+    path("products/<int:pk>/", read_views.ProductDetailView.as_view(), name="products-detail"),
     path("orders/", OrderListView.as_view(), name="orders-list"),
     path("orders/create/", OrderCreateView.as_view(), name="orders-create"),
-    path("orders/<str:order_no>/", OrderDetailView.as_view(), name="orders-detail"),
+    path("orders/export/", OrderExportView.as_view(), name="orders-export"),
+    path("orders/status/", OrderStatusTransitionView.as_view(), name="orders-status"),
+    path("orders/tickets/<str:ticket>/", OrderTicketView.as_view(), name="orders-ticket"),
+    path("orders/<str:order_no>/", read_views.OrderDetailView.as_view(), name="orders-detail"),
+    # 管理員報表
+    path("reports/sales/", SalesReportView.as_view(), name="reports-sales"),
 ]
 
 
@@ -1,27 +1,46 @@
 from __future__ import annotations
 
-from decimal import Decimal
-from random import randint
+import datetime as dt
+from collections import Counter
 
-from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.csrf import ensure_csrf_cookie
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Order, OrderItem, Product, ShopSettings, Tag
+from . import (
+    catalog,
+    fast_serializers,
+    idempotency,
+    inventory,
+    order_export,
+    order_numbers,
+    order_queue,
+    order_status,
+    pricing,
+    sales,
+    shop_settings,
+)
+from .models import Order, OrderItem, OrderTicket, Product, Tag
+from .pagination import OrderCursorPagination, ProductCursorPagination
 from .serializers import (
     OrderCreateSerializer,
+    OrderStatusTransitionSerializer,
     OrderSerializer,
     ProductSerializer,
     TagSerializer,
-    calculate_total,
-    get_product_name,
-    get_product_price,
 )
+from .throttling import BrowseThrottle, CheckoutThrottle
 
 
 @api_view(['GET'])
@@ -37,39 +56,82 @@ def csrf_token_view(request):
     return Response({"csrfToken": token})
 
 
+def _requested_fields(request) -> list[str] | None:
+    """fields=id,name,price → ["id", "name", "price"]；未指定時回傳 None（全部欄位）"""
+    fields_param = request.query_params.get("fields", "").strip()
+    fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+    return fields or None
+
+
 # ========== 公開 API ==========
 
 
-class TagListView(generics.ListAPIView):
+class CatalogConditionalMixin:
+    """
+    以目錄版本做條件式 GET：用戶端帶的 If-None-Match / If-Modified-Since 仍有效時
+    直接回 304，不執行 queryset 也不序列化。
+    ETag 是 primary 目前的版本，內容也必須讀 primary（不設 use_replica），
+    否則 replica 尚未同步的舊內容會被用戶端與 CDN 以新 ETag 快取
+    """
+
+    def get(self, request, *args, **kwargs):
+        etag = catalog.get_etag()
+        last_modified = catalog.get_last_modified()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response.headers["ETag"] = etag
+                if timestamp is not None:
+                    response.headers["Last-Modified"] = http_date(timestamp)
+        # 允許快取但每次都要重新驗證，後台修改才能立即生效
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class TagListView(CatalogConditionalMixin, generics.ListAPIView):
     queryset = Tag.objects.order_by("name")
     serializer_class = TagSerializer
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(CatalogConditionalMixin, generics.ListAPIView):
+    """商品列表：從目錄快照讀取並在記憶體中篩選，快照有效且沒有搜尋時不查資料庫"""
     serializer_class = ProductSerializer
+    pagination_class = ProductCursorPagination
 
     def get_queryset(self):
-        qs = Product.objects.filter(is_active=True).prefetch_related("tags", "variants").order_by("id")
+        return catalog.active_products_queryset()
 
+    def list(self, request, *args, **kwargs):
         # tags=tag1,tag2
-        tags_param = self.request.query_params.get("tags", "").strip()
-        if tags_param:
-            tag_names = [t.strip() for t in tags_param.split(",") if t.strip()]
-            if tag_names:
-                qs = qs.filter(tags__name__in=tag_names).distinct()
+        tags_param = request.query_params.get("tags", "").strip()
+        tag_names = [t.strip() for t in tags_param.split(",") if t.strip()]
+        search = request.query_params.get("search", "").strip()
 
-        search = self.request.query_params.get("search", "").strip()
+        products = catalog.get_active_products()
         if search:
-            qs = qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
+            products = catalog.search_products(products, search)
+        products = catalog.filter_by_tags(products, tag_names)
 
-        return qs
+        # 不分頁時依搜尋相關度排序；分頁時 cursor 需要穩定的排序鍵，一律依 id 排序
+        page = self.paginate_queryset(products)
+        if page is not None:
+            products = page
 
+        fields = _requested_fields(request)
+        if fields:
+            products = [{k: p[k] for k in fields if k in p} for p in products]
 
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True).prefetch_related("tags", "variants")
-    serializer_class = ProductSerializer
+        if page is not None:
+            return self.get_paginated_response(products)
+        return Response(products)
 
 
+class ProductDetailView(CatalogConditionalMixin, generics.RetrieveAPIView):
+    queryset = Product.objects.filter(is_active=True).prefetch_related("tags", "variants")
+    serializer_class = ProductSerializer
 
 
 class ApiRootView(APIView):
@@ -91,16 +153,9 @@ def _line_chat_url(line_oa_id: str) -> str:
     return f"https://line.me/R/ti/p/{line_oa_id}"
 
 
-def _get_settings() -> ShopSettings:
-    """每次請求都從資料庫讀取，確保設定更新後立即生效"""
-    settings, _ = ShopSettings.objects.get_or_create(singleton_key="default")
-    return settings
-
-
-
-
-def _extras_for_order(order: Order) -> dict:
-    s = _get_settings()
+def _extras_for_order(order: Order, s=None) -> dict:
+    """s 為 ShopSettings；未傳入時從快取取得（async view 會先自行以 aget_settings 取得）"""
+    s = s or shop_settings.get_settings()
     chat_url = _line_chat_url(s.line_oa_id)
     return {
         "transfer": {
@@ -116,104 +171,144 @@ def _extras_for_order(order: Order) -> dict:
     }
 
 
-def _generate_order_no() -> str:
-    """生成訂單編號，格式：MKT-YYYYMMDD-HHMMSS-RAND"""
-    now = timezone.localtime()
-    return f"MKT-{now:%Y%m%d-%H%M%S}-{randint(1000, 9999)}"
-
-
-def _validate_order_items(items: list[dict], products_by_id: dict[int, Product]) -> tuple[list[int], Decimal]:
-    """驗證訂單項目並計算總金額，返回 (missing_product_ids, total_amount)"""
-    product_ids = sorted({it["product_id"] for it in items})
-    missing = [pid for pid in product_ids if pid not in products_by_id]
-    total_amount = calculate_total(items, products_by_id)
-    return missing, total_amount
-
-
-def _create_order_items(order: Order, items: list[dict], products_by_id: dict[int, Product]) -> None:
-    """建立訂單項目"""
-    order_items: list[OrderItem] = []
-    for it in items:
-        product = products_by_id[it["product_id"]]
-        qty = int(it["quantity"])
-        variant_id = it.get("variant_id")
-        unit_price = get_product_price(product, variant_id)
-        product_name = get_product_name(product, variant_id)
-        line_total = unit_price * qty
-        order_items.append(
-            OrderItem(
-                order=order,
-                product=product,
-                product_name_snapshot=product_name,
-                unit_price_snapshot=unit_price,
-                quantity=qty,
-                line_total=line_total,
-            )
-        )
-    OrderItem.objects.bulk_create(order_items)
+def _create_order_items(order: Order, lines: tuple[pricing.PricedLine, ...]) -> list[OrderItem]:
+    """建立訂單項目（單一 bulk insert）"""
+    return OrderItem.objects.bulk_create(order_queue.build_items(order, lines))
 
 
 class OrderCreateView(APIView):
+    throttle_classes = [CheckoutThrottle]
+
     def post(self, request):
+        """帶 Idempotency-Key header 時，重送的請求回放第一次的結果（見 idempotency.py）"""
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return self._create(request)
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return Response({"detail": "Idempotency-Key 過長"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            claim = idempotency.begin(key, request.data)
+        except idempotency.KeyReused:
+            return Response(
+                {"detail": "Idempotency-Key 已用於內容不同的請求"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        except idempotency.RequestInProgress:
+            return Response(
+                {"detail": "相同 Idempotency-Key 的請求仍在處理中，請稍後再試"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"},
+            )
+        if claim.replay is not None:
+            status_code, body = claim.replay
+            return Response(body, status=status_code, headers={"Idempotent-Replayed": "true"})
+
+        try:
+            response = self._create(request)
+        except BaseException:
+            claim.abandon()
+            raise
+        if status.is_success(response.status_code):
+            claim.complete(response.status_code, response.data)
+        else:
+            claim.abandon()
+        return response
+
+    def _create(self, request):
         serializer = OrderCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        items = data["items"]
-        product_ids = sorted({it["product_id"] for it in items})
-        products = list(Product.objects.filter(id__in=product_ids, is_active=True))
-        products_by_id = {p.id: p for p in products}
-
-        missing, total_amount = _validate_order_items(items, products_by_id)
-        if missing:
+        priced = pricing.price_order(data["items"])
+        if priced.missing_product_ids:
+            return Response(
+                {"detail": f"找不到商品或已下架: {list(priced.missing_product_ids)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if priced.missing_variant_ids:
             return Response(
-                {"detail": f"找不到商品或已下架: {missing}"},
+                {"detail": f"找不到規格或已停用: {list(priced.missing_variant_ids)}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        with transaction.atomic():
-            # 使用資料庫唯一約束保證訂單編號唯一性，衝突時重試（最多 5 次）
-            max_retries = 5
-            for attempt in range(max_retries):
-                order_no = _generate_order_no()
-                try:
-                    order = Order.objects.create(
-                        order_no=order_no,
-                        customer_name=data["customer_name"],
-                        customer_phone=data["customer_phone"],
-                        pickup_store_address=data["pickup_store_address"],
-                        total_amount=total_amount,
-                        status=Order.Status.NEW,
-                    )
-                    break
-                except IntegrityError:
-                    if attempt == max_retries - 1:
-                        return Response(
-                            {"detail": "無法生成唯一訂單編號，請稍後再試"},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        )
-
-            _create_order_items(order, items, products_by_id)
+        if settings.ORDER_INTAKE_QUEUED:
+            # 佇列模式：不在請求內開交易寫訂單，交給 run_order_worker 批次建立
+            ticket = order_queue.enqueue(data)
+            url = reverse("orders-ticket", kwargs={"ticket": ticket.ticket})
+            return Response(
+                {"ticket": ticket.ticket, "status": ticket.status, "total_amount": str(priced.total), "status_url": url},
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Location": url},
+            )
+
+        order_no = order_numbers.generate()
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_no=order_no,
+                    customer_name=data["customer_name"],
+                    customer_phone=data["customer_phone"],
+                    pickup_store_address=data["pickup_store_address"],
+                    total_amount=priced.total,
+                    status=Order.Status.NEW,
+                )
+                items = _create_order_items(order, priced.lines)
+                # 最後才扣庫存與累加銷售彙總，縮短熱門商品列與彙總列鎖的持有時間
+                inventory.reserve(priced.lines)
+                sales.record_created([(order, items)])
+        except inventory.OutOfStock as e:
+            return Response({"detail": f"庫存不足: {e.name}"}, status=status.HTTP_409_CONFLICT)
 
         resp = OrderSerializer(order).data
         resp.update(_extras_for_order(order))
         return Response(resp, status=status.HTTP_201_CREATED)
 
 
+class OrderTicketView(APIView):
+    """佇列模式下單的結果：DONE 時附上與同步下單相同格式的訂單內容"""
+    throttle_classes = [BrowseThrottle]
+
+    def get(self, request, ticket):
+        ticket = get_object_or_404(OrderTicket, ticket=ticket)
+        data = {"ticket": ticket.ticket, "status": ticket.status, "order": None, "detail": ticket.error or None}
+        if ticket.order_id:
+            order = Order.objects.prefetch_related("items").get(pk=ticket.order_id)
+            data["order"] = OrderSerializer(order).data
+            data["order"].update(_extras_for_order(order))
+        headers = {}
+        if ticket.status in (OrderTicket.Status.PENDING, OrderTicket.Status.PROCESSING):
+            headers["Retry-After"] = "1"
+        return Response(data, headers=headers)
+
+
 class OrderListView(generics.ListAPIView):
     """訂單列表（需要管理員認證，保護客戶個資）"""
+    use_replica = True  # 讀取可走 replica（config/db_router.py）
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = OrderCursorPagination
 
     def get_queryset(self):
-        qs = Order.objects.prefetch_related("items").order_by("-created_at")
+        qs = Order.objects.order_by("-created_at", "-id")
         search = self.request.query_params.get("search", "").strip()
         if search:
             qs = qs.filter(Q(order_no__icontains=search) | Q(customer_phone__icontains=search))
         return qs
 
+    def list(self, request, *args, **kwargs):
+        # 以 .values() 分頁後直接組 dict（見 fast_serializers.py），需要 items 時多 1 個查詢
+        fields = _requested_fields(request)
+        queryset = fast_serializers.order_values(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        data = fast_serializers.orders(page if page is not None else list(queryset), fields)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
 
 class OrderDetailView(generics.RetrieveAPIView):
+    throttle_classes = [BrowseThrottle]
     serializer_class = OrderSerializer
     lookup_field = "order_no"
     queryset = Order.objects.prefetch_related("items").all()
@@ -223,3 +318,100 @@ class OrderDetailView(generics.RetrieveAPIView):
         data = OrderSerializer(order).data
         data.update(_extras_for_order(order))
         return Response(data)
+
+
+class OrderStatusTransitionView(APIView):
+    """
+    批次變更訂單狀態（需要管理員認證，見 order_status.py）
+    POST /api/orders/status/ {"order_nos": [...], "status": "CONFIRMED" | "CANCELLED"}
+    每張訂單回傳 changed / unchanged / invalid_transition / not_found
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = OrderStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        to_status = serializer.validated_data["status"]
+        order_nos = list(dict.fromkeys(serializer.validated_data["order_nos"]))
+
+        outcomes = order_status.transition(Order.objects.filter(order_no__in=order_nos), to_status, request.user)
+        by_no = {o.order_no: o for o in outcomes}
+        results = [
+            {"order_no": no, "result": by_no[no].result, "from_status": by_no[no].from_status}
+            if no in by_no
+            else {"order_no": no, "result": "not_found", "from_status": None}
+            for no in order_nos
+        ]
+        return Response({
+            "status": to_status,
+            "counts": Counter(r["result"] for r in results),
+            "results": results,
+        })
+
+
+class OrderExportView(APIView):
+    """
+    訂單串流匯出（需要管理員認證）
+    GET /api/orders/export/?from=2026-01-01&to=2026-12-31&status=CONFIRMED&output=csv|ndjson
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            created_from = order_export.parse_bound(params.get("from", "").strip())
+            created_to = order_export.parse_bound(params.get("to", "").strip(), end=True)
+        except ValueError as e:
+            raise serializers.ValidationError({"detail": f"日期格式錯誤: {e}"})
+
+        status_param = params.get("status", "").strip() or None
+        if status_param and status_param not in Order.Status.values:
+            raise serializers.ValidationError({"status": f"不支援的狀態: {status_param}"})
+
+        output = params.get("output", "csv").strip()
+        if output not in ("csv", "ndjson"):
+            raise serializers.ValidationError({"output": "只支援 csv 或 ndjson"})
+
+        rows = order_export.iter_rows(created_from, created_to, status_param)
+        if output == "csv":
+            response = StreamingHttpResponse(order_export.stream_csv(rows), content_type="text/csv; charset=utf-8")
+        else:
+            response = StreamingHttpResponse(order_export.stream_ndjson(rows), content_type="application/x-ndjson")
+        filename = f"orders-{timezone.localtime():%Y%m%d-%H%M%S}.{output}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SalesReportView(APIView):
+    """
+    銷售報表（需要管理員認證），只讀每日彙總表（見 sales.py），不掃描訂單也不併入差額（由排程執行）
+    GET /api/reports/sales/?start=2026-01-01&end=2026-01-31&status=NEW,CONFIRMED&top=10
+    未指定日期時為最近 7 天；未指定狀態時不含已取消的訂單
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = dt.date.fromisoformat(params.get("end", "").strip() or timezone.localdate().isoformat())
+            start_param = params.get("start", "").strip()
+            start = dt.date.fromisoformat(start_param) if start_param else end - dt.timedelta(days=6)
+        except ValueError as e:
+            raise serializers.ValidationError({"detail": f"日期格式錯誤: {e}"})
+        if start > end:
+            raise serializers.ValidationError({"detail": "start 不能晚於 end"})
+
+        status_param = params.get("status", "").strip()
+        statuses = [s.strip() for s in status_param.split(",") if s.strip()] or [
+            Order.Status.NEW, Order.Status.CONFIRMED
+        ]
+        invalid = [s for s in statuses if s not in Order.Status.values]
+        if invalid:
+            raise serializers.ValidationError({"status": f"不支援的狀態: {', '.join(invalid)}"})
+
+        try:
+            top = min(max(int(params.get("top", "10")), 1), 100)
+        except ValueError:
+            raise serializers.ValidationError({"top": "必須是整數"})
+
+        return Response(sales.report(start, end, [str(s) for s in statuses], top))
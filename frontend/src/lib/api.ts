@@ -88,9 +88,9 @@ if (needsCsrf) {
 }
   
   const res = await fetch(url, {
-    headers,
     credentials: 'include', // 資安：允許傳送 Cookie（Session）
     ...init,
+    headers, // 放在 init 之後：init.headers 已合併進來，不能整個蓋掉 Content-Type / CSRF
   });
   if (!res.ok) {
     const text = await res.text();
@@ -133,7 +133,8 @@ function buildQueryString(params: Record<string, string | string[] | undefined>)
 }
 
 export async function listProducts(params?: { tags?: string[]; search?: string }): Promise<Product[]> {
-  return http<Product[]>(`/api/products/${buildQueryString(params || {})}`);
+  // 前台一次顯示全部商品，使用不分頁的陣列格式
+  return http<Product[]>(`/api/products/${buildQueryString({ ...params, paginate: 'false' })}`);
 }
 
 export async function getProductDetail(id: string): Promise<Product> {
@@ -145,8 +146,32 @@ export async function createOrder(input: {
   customer_phone: string;
   pickup_store_address: string;
   items: { product_id: number; quantity: number; variant_id?: number }[];
-}): Promise<Order> {
-  return http<Order>('/api/orders/create/', { method: 'POST', body: JSON.stringify(input) });
+}, idempotencyKey?: string): Promise<Order> {
+  // 帶 Idempotency-Key 時，網路重送同一張訂單會拿到第一次的結果，不會重複下單
+  const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined;
+  const result = await http<Order | OrderTicket>('/api/orders/create/', {
+    method: 'POST',
+    body: JSON.stringify(input),
+    headers,
+  });
+  // 後端開啟佇列模式時回 202 + ticket，輪詢到訂單成立為止
+  return 'ticket' in result ? waitForOrder(result.ticket) : result;
+}
+
+export type OrderTicket = {
+  ticket: string;
+  status: 'PENDING' | 'PROCESSING' | 'DONE' | 'FAILED';
+  order: Order | null;
+  detail: string | null;
+};
+
+async function waitForOrder(ticket: string): Promise<Order> {
+  for (let delay = 500; ; delay = Math.min(delay * 2, 4000)) {
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    const t = await http<OrderTicket>(`/api/orders/tickets/${ticket}/`);
+    if (t.status === 'DONE' && t.order) return t.order;
+    if (t.status === 'FAILED') throw new Error(t.detail || '下單失敗');
+  }
 }
 
 export async function getOrder(orderNo: string): Promise<Order> {
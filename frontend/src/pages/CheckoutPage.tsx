@@ -10,6 +10,8 @@ export function CheckoutPage() {
   const cart = useCart();
   const nav = useNavigate();
   const [submitting, setSubmitting] = useState(false);
+  // 同一次結帳重複送出時共用同一個 key，避免重複下單
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
   const [form] = Form.useForm();
 
   if (cart.items.length === 0) {
@@ -59,7 +61,7 @@ export function CheckoutPage() {
                       quantity: it.quantity,
                       variant_id: it.variantId || undefined,
                     })),
-                  });
+                  }, idempotencyKey);
                   cart.clear();
                   nav(`/complete/${order.order_no}`, { state: order });
                 } catch (e) {